@@ -0,0 +1,56 @@
+"""
+reports bcrypt hash and check latency per cost on this machine,
+to help choose "password_hashing.rounds" of accounts service config.
+
+usage: python benchmarks/password_hash_cost.py --min-rounds 10 --max-rounds 14 --samples 5
+"""
+
+import argparse
+import statistics
+import time
+
+import bcrypt
+
+
+def time_call(func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start_time) * 1000, result
+
+
+def benchmark_rounds(rounds, samples, password=b'correct horse battery staple'):
+    hash_timings = []
+    check_timings = []
+    for i in range(samples):
+        hash_ms, hashed_password = time_call(bcrypt.hashpw, password, bcrypt.gensalt(rounds=rounds))
+        check_ms, matches = time_call(bcrypt.checkpw, password, hashed_password)
+        assert matches
+        hash_timings.append(hash_ms)
+        check_timings.append(check_ms)
+    return hash_timings, check_timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bcrypt latency per cost')
+    parser.add_argument('--min-rounds', type=int, default=10)
+    parser.add_argument('--max-rounds', type=int, default=14)
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=250, help='highlights highest cost within this latency')
+    args = parser.parse_args()
+
+    print('{:>6} {:>12} {:>12} {:>12}'.format('rounds', 'hash_ms', 'check_ms', 'checks/s'))
+    recommended_rounds = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        hash_timings, check_timings = benchmark_rounds(rounds, args.samples)
+        check_ms = statistics.median(check_timings)
+        print('{:>6} {:>12.1f} {:>12.1f} {:>12.1f}'.format(
+            rounds, statistics.median(hash_timings), check_ms, 1000 / check_ms))
+        if check_ms <= args.target_ms:
+            recommended_rounds = rounds
+
+    if recommended_rounds is not None:
+        print('highest cost within {}ms per check, per core: {}'.format(args.target_ms, recommended_rounds))
+
+
+if __name__ == '__main__':
+    main()
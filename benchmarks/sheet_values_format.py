@@ -0,0 +1,107 @@
+"""
+compares values format conversion of gsheets Sheet endpoint, over synthetic sheets:
+per cell python loops, as in google_helper's sheet_values_for, against columnar conversion of sheet_values_helper.
+
+usage: python benchmarks/sheet_values_format.py --rows 100000 --fields 12 --repeat 3
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vedavaapi.gservices import sheet_values_helper  # noqa: E402
+
+
+def synthetic_sheet(rows_count, fields_count, seed=0):
+    rng = random.Random(seed)
+    headers_row = ['field{} description of field {}'.format(i, i) for i in range(fields_count)]
+    headers_row[0] = '#' + headers_row[0]
+    rows = []
+    for i in range(rows_count):
+        # ragged rows, as sheets api trims trailing empty cells; and some comment and filler rows.
+        width = rng.randint(1, fields_count)
+        row = ['v{}_{}'.format(i, j) for j in range(width)]
+        if i % 97 == 0:
+            row[0] = '#comment'
+        elif i % 89 == 0:
+            row = ['-', ' ']
+        rows.append(row)
+    return headers_row, rows
+
+
+def loops_tabulate(headers_row, rows, reqd_fields, values_format, hdr_split_char=' '):
+    # conversion as done by google_helper's GSheets.sheet_values_for
+    headers_row = [s.lstrip() for s in headers_row]
+    if headers_row[0][0] == '#':
+        headers_row[0] = headers_row[0][1:]
+    hdr_split = [e.split(hdr_split_char, 1) if hdr_split_char in e else [e, ''] for e in headers_row]
+    (cols, coldescs) = zip(*hdr_split)
+    idx = dict(zip(cols, range(len(cols))))
+    values = []
+    for row in rows:
+        if not len(row) or row[0].startswith('#'):
+            continue
+        if True not in [not (re.match(r'^[\s\-]*$', e)) for e in row]:
+            continue
+        values_row = list(row)
+        if len(values_row) < len(cols):
+            values_row += [''] * (len(cols) - len(values_row))
+        values.append(values_row)
+
+    reqd_fields = list(cols) if reqd_fields is None else reqd_fields
+    indices = [idx[f] for f in reqd_fields]
+    fields = [cols[i] for i in indices]
+    final_values = [[values[i][j] for j in indices] for i in range(len(values))]
+    return {
+        'rows': final_values,
+        'columns': [[final_values[i][j] for i in range(len(final_values))] for j in range(len(fields))],
+        'maps': [dict(zip(fields, valrow)) for valrow in final_values]
+    }.get(values_format)
+
+
+def columnar_tabulate(headers_row, rows, reqd_fields, values_format):
+    tabulated, error = sheet_values_helper.tabulate(
+        headers_row, rows, reqd_fields=reqd_fields, values_format=values_format)
+    return tabulated[2]
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sheet values format conversion')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--fields', type=int, default=12)
+    parser.add_argument('--selected-fields', type=int, default=None, help='number of fields selected; all by default')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    headers_row, rows = synthetic_sheet(args.rows, args.fields)
+    reqd_fields = None
+    if args.selected_fields is not None:
+        reqd_fields = ['field{}'.format(i) for i in range(0, args.fields, 2)][:args.selected_fields]
+
+    print('{} rows, {} fields, selected: {}'.format(args.rows, args.fields, reqd_fields or 'all'))
+    print('{:>8} {:>12} {:>14} {:>9}'.format('format', 'loops_ms', 'columnar_ms', 'speedup'))
+    for values_format in sheet_values_helper.values_formats:
+        loops_ms, loops_result = best_of(args.repeat, loops_tabulate, headers_row, rows, reqd_fields, values_format)
+        columnar_ms, columnar_result = best_of(
+            args.repeat, columnar_tabulate, headers_row, rows, reqd_fields, values_format)
+        assert loops_result == columnar_result, 'results differ for {}'.format(values_format)
+        print('{:>8} {:>12.1f} {:>14.1f} {:>8.1f}x'.format(
+            values_format, loops_ms, columnar_ms, loops_ms / columnar_ms))
+
+
+if __name__ == '__main__':
+    main()
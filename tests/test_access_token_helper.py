@@ -0,0 +1,190 @@
+import json
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib import parse
+
+import pytest
+
+pytest.importorskip('requests')
+pytest.importorskip('vedavaapi.google_helper')
+
+from vedavaapi.gservices import access_token_helper  # noqa: E402
+from vedavaapi.gservices.access_token_helper import AccessTokenCache, AccessTokenError  # noqa: E402
+
+
+class TokenEndpoint(ThreadingMixIn, HTTPServer):
+    """
+    local stand in for google's token endpoint. issues "token-<n>" for n'th request.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        self.requests = []
+        self.requests_lock = threading.Lock()
+        self.status = 200
+        self.delay = 0
+        self.expires_in = 3600
+        super(TokenEndpoint, self).__init__(('127.0.0.1', 0), _TokenRequestHandler)
+
+    @property
+    def token_uri(self):
+        return 'http://127.0.0.1:{}/token'.format(self.server_address[1])
+
+
+class _TokenRequestHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        server = self.server
+        form = dict(parse.parse_qsl(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8')))
+        with server.requests_lock:
+            server.requests.append(form)
+            count = len(server.requests)
+        time.sleep(server.delay)
+
+        if server.status == 200:
+            body = {"access_token": "token-{}".format(count), "token_type": "Bearer", "expires_in": server.expires_in}
+        else:
+            body = {"error": "internal_failure"}
+        body_bytes = json.dumps(body).encode('utf-8')
+        self.send_response(server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body_bytes)))
+        self.end_headers()
+        self.wfile.write(body_bytes)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    server = TokenEndpoint()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # cache's notion of time; endpoint's delays are still real.
+    fake_clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(access_token_helper, 'time', types.SimpleNamespace(time=lambda: fake_clock.now))
+    return fake_clock
+
+
+def _creds(endpoint, refresh_token='refresh-1'):
+    return {
+        "token_uri": endpoint.token_uri, "client_id": "client-1", "client_secret": "secret-1",
+        "refresh_token": refresh_token
+    }
+
+
+def test_token_is_cached_till_refresh_margin(endpoint, clock):
+    endpoint.expires_in = 100
+    cache = AccessTokenCache(refresh_margin=10)
+    creds = _creds(endpoint)
+
+    assert cache.get('org1', creds) == ('Bearer', 'token-1')
+    assert endpoint.requests[0] == {
+        "grant_type": "refresh_token", "refresh_token": "refresh-1",
+        "client_id": "client-1", "client_secret": "secret-1"
+    }
+
+    clock.now += 89
+    assert cache.get('org1', creds) == ('Bearer', 'token-1')
+    assert len(endpoint.requests) == 1
+
+    clock.now += 2
+    assert cache.get('org1', creds) == ('Bearer', 'token-2')
+    assert len(endpoint.requests) == 2
+
+
+def test_tokens_are_cached_per_org_and_credential(endpoint, clock):
+    cache = AccessTokenCache()
+    assert cache.get('org1', _creds(endpoint)) == ('Bearer', 'token-1')
+    assert cache.get('org2', _creds(endpoint)) == ('Bearer', 'token-2')
+    assert cache.get('org1', _creds(endpoint, refresh_token='refresh-2')) == ('Bearer', 'token-3')
+    assert cache.get('org1', _creds(endpoint)) == ('Bearer', 'token-1')
+    assert cache.stats() == {"tokens": 3, "refreshes": 3, "refresh_failures": 0}
+
+
+def test_concurrent_callers_share_single_refresh(endpoint):
+    endpoint.delay = 0.3
+    cache = AccessTokenCache()
+    creds = _creds(endpoint)
+    results = []
+    start = threading.Barrier(10)
+
+    def get_token():
+        start.wait()
+        results.append(cache.get('org1', creds))
+
+    threads = [threading.Thread(target=get_token) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [('Bearer', 'token-1')] * 10
+    assert len(endpoint.requests) == 1
+
+
+def test_failed_refresh_backs_off(endpoint, clock):
+    endpoint.status = 500
+    cache = AccessTokenCache(failure_backoff=5)
+    creds = _creds(endpoint)
+
+    with pytest.raises(AccessTokenError):
+        cache.get('org1', creds)
+    assert len(endpoint.requests) == 1
+
+    clock.now += 4
+    with pytest.raises(AccessTokenError):
+        cache.get('org1', creds)
+    assert len(endpoint.requests) == 1
+
+    endpoint.status = 200
+    clock.now += 2
+    assert cache.get('org1', creds) == ('Bearer', 'token-2')
+    assert cache.stats()['refresh_failures'] == 1
+
+
+def test_still_valid_token_is_served_while_backing_off(endpoint, clock):
+    endpoint.expires_in = 100
+    cache = AccessTokenCache(refresh_margin=10, failure_backoff=5)
+    creds = _creds(endpoint)
+    assert cache.get('org1', creds) == ('Bearer', 'token-1')
+
+    endpoint.status = 500
+    clock.now += 95
+    assert cache.get('org1', creds) == ('Bearer', 'token-1')
+    assert len(endpoint.requests) == 2
+
+    clock.now += 1
+    assert cache.get('org1', creds) == ('Bearer', 'token-1')
+    assert len(endpoint.requests) == 2
+
+    clock.now += 5
+    with pytest.raises(AccessTokenError):
+        cache.get('org1', creds)
+    assert len(endpoint.requests) == 3
+
+
+def test_unreachable_endpoint_fails_within_timeout(clock):
+    cache = AccessTokenCache(connect_timeout=0.5, read_timeout=0.5)
+    creds = dict(_creds(types.SimpleNamespace(token_uri='http://127.0.0.1:9/token')))
+    with pytest.raises(AccessTokenError):
+        cache.get('org1', creds)
+
+
+def test_invalidated_token_is_refreshed(endpoint, clock):
+    cache = AccessTokenCache()
+    creds = _creds(endpoint)
+    assert cache.get('org1', creds) == ('Bearer', 'token-1')
+    cache.invalidate('org1', creds)
+    assert cache.get('org1', creds) == ('Bearer', 'token-2')
@@ -0,0 +1,39 @@
+from urllib import parse
+
+from vedavaapi.common.helpers.db_clients_helper import _with_uri_options
+
+
+def _query(uri):
+    return parse.parse_qs(parse.urlsplit(uri).query)
+
+
+def test_no_options_leaves_host_unchanged():
+    assert _with_uri_options('localhost:27017', None) == 'localhost:27017'
+    assert _with_uri_options('mongodb://localhost:27017', {}) == 'mongodb://localhost:27017'
+
+
+def test_options_follow_slash_in_uri_without_database():
+    assert _with_uri_options('mongodb://localhost:27017', {"maxPoolSize": 10}) == \
+        'mongodb://localhost:27017/?maxPoolSize=10'
+
+
+def test_bare_host_port_becomes_uri():
+    assert _with_uri_options('localhost:27017', {"maxPoolSize": 10}) == 'mongodb://localhost:27017/?maxPoolSize=10'
+    assert _with_uri_options('localhost', {"maxPoolSize": 10}) == 'mongodb://localhost/?maxPoolSize=10'
+
+
+def test_database_credentials_and_hosts_are_kept():
+    uri = _with_uri_options('mongodb://user:p%40ss@a:27017,b:27017/admin?replicaSet=rs0', {"minPoolSize": 2})
+    assert uri == 'mongodb://user:p%40ss@a:27017,b:27017/admin?replicaSet=rs0&minPoolSize=2'
+
+
+def test_options_in_uri_take_precedence():
+    uri = _with_uri_options('mongodb://localhost/?maxpoolsize=5', {"maxPoolSize": 10, "waitQueueTimeoutMS": 1000})
+    assert _query(uri) == {"maxpoolsize": ["5"], "waitQueueTimeoutMS": ["1000"]}
+    assert _with_uri_options('mongodb://localhost/?maxPoolSize=5', {"maxPoolSize": 10}) == \
+        'mongodb://localhost/?maxPoolSize=5'
+
+
+def test_bool_options_are_lower_cased():
+    assert _query(_with_uri_options('mongodb+srv://cluster.example.net', {"retryWrites": False})) == \
+        {"retryWrites": ["false"]}
@@ -0,0 +1,165 @@
+import pytest
+
+pytest.importorskip('sanskrit_ld')
+pytest.importorskip('vedavaapi.objectdb')
+
+from vedavaapi.accounts.agents_helpers import groups_helper  # noqa: E402
+
+
+class CountingColln(object):
+    """
+    in memory stand in for groups collection, supporting only queries made by groups_helper; counts round trips.
+    """
+
+    def __init__(self, docs):
+        self.docs = dict((doc['_id'], doc) for doc in docs)
+        self.find_count = 0
+        self.find_one_count = 0
+
+    @staticmethod
+    def _matches(doc, query):
+        for key, condition in query.items():
+            value = doc.get(key, None)
+            if isinstance(condition, dict) and '$in' in condition:
+                if value not in condition['$in']:
+                    return False
+            elif isinstance(value, list):
+                if condition not in value:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        self.find_count += 1
+        return [dict(doc) for doc in self.docs.values() if self._matches(doc, query)]
+
+    def find_one(self, query, projection=None):
+        self.find_one_count += 1
+        found = self.find(query, projection=projection)
+        self.find_count -= 1
+        return found[0] if found else None
+
+
+def _group(_id, source=None, members=None, ancestors=None):
+    group = {"_id": _id, "jsonClass": "UsersGroup", "members": members or []}
+    if source is not None:
+        group['source'] = source
+    if ancestors is not None:
+        group['ancestors'] = ancestors
+    return group
+
+
+def _chain(depth, member_id='u1'):
+    # g0 is root; g(depth) has user as member.
+    groups = [_group('g0')]
+    for i in range(1, depth + 1):
+        groups.append(_group('g{}'.format(i), source='g{}'.format(i - 1)))
+    groups[-1]['members'] = [member_id]
+    return groups
+
+
+def test_ancestry_of_deep_chain_takes_one_query_per_level():
+    depth = 20
+    colln = CountingColln(_chain(depth))
+    ancestor_jsons = groups_helper.get_groups_ancestry(colln, [colln.docs['g{}'.format(depth)]])
+
+    assert [g['_id'] for g in ancestor_jsons] == ['g{}'.format(i) for i in range(depth - 1, -1, -1)]
+    assert colln.find_count == depth
+
+
+def test_ancestry_of_diamond_is_deduplicated():
+    # left and right share top; bottom_left and bottom_right share both through their sources.
+    colln = CountingColln([
+        _group('top'),
+        _group('left', source='top'), _group('right', source='top'),
+        _group('bottom_left', source='left'), _group('bottom_right', source='right'),
+    ])
+    ancestor_jsons = groups_helper.get_groups_ancestry(
+        colln, [colln.docs['bottom_left'], colln.docs['bottom_right']])
+
+    ancestor_ids = [g['_id'] for g in ancestor_jsons]
+    assert sorted(ancestor_ids[:2]) == ['left', 'right']
+    assert ancestor_ids[2:] == ['top']
+    assert colln.find_count == 2
+
+
+@pytest.mark.parametrize('groups', [
+    [_group('a', source='b'), _group('b', source='c'), _group('c', source='a')],
+    [_group('a', source='a')],
+])
+def test_ancestry_terminates_on_source_cycle(groups):
+    colln = CountingColln(groups)
+    ancestor_jsons = groups_helper.get_groups_ancestry(colln, [colln.docs['a']])
+
+    assert sorted(g['_id'] for g in ancestor_jsons) == sorted(g['_id'] for g in groups if g['_id'] != 'a')
+    assert colln.find_count <= len(groups)
+
+
+def test_ancestry_of_missing_source_stops():
+    colln = CountingColln([_group('a', source='deleted')])
+    assert groups_helper.get_groups_ancestry(colln, [colln.docs['a']]) == []
+    assert colln.find_count == 1
+
+
+def test_user_groups_of_deep_chain():
+    depth = 15
+    colln = CountingColln(_chain(depth))
+
+    group_ids = groups_helper.get_user_group_ids(colln, 'u1')
+    assert group_ids == ['g{}'.format(i) for i in range(depth, -1, -1)]
+    # explicit groups, then one query per level.
+    assert colln.find_count == 1 + depth
+
+    colln.find_count = 0
+    group_jsons = groups_helper.get_user_groups(colln, 'u1')
+    assert sorted(g['_id'] for g in group_jsons) == sorted(group_ids)
+    # and one more for ancestor group documents.
+    assert colln.find_count == 2 + depth
+
+
+def test_user_groups_of_diamond():
+    colln = CountingColln([
+        _group('top'),
+        _group('left', source='top', members=['u1']), _group('right', source='top', members=['u1']),
+        _group('other', members=['u2']),
+    ])
+
+    group_ids = groups_helper.get_user_group_ids(colln, 'u1')
+    assert sorted(group_ids[:2]) == ['left', 'right']
+    assert group_ids[2:] == ['top']
+    assert colln.find_count == 2
+
+    group_jsons = groups_helper.get_user_groups(colln, 'u1')
+    assert sorted(g['_id'] for g in group_jsons) == ['left', 'right', 'top']
+
+
+def test_user_groups_with_source_cycle():
+    colln = CountingColln([_group('a', source='b', members=['u1']), _group('b', source='a')])
+
+    assert groups_helper.get_user_group_ids(colln, 'u1') == ['a', 'b']
+    assert sorted(g['_id'] for g in groups_helper.get_user_groups(colln, 'u1')) == ['a', 'b']
+
+
+def test_user_groups_with_materialized_ancestors_take_constant_queries():
+    depth = 30
+    groups = _chain(depth)
+    for i, group in enumerate(groups):
+        group['ancestors'] = ['g{}'.format(j) for j in range(i - 1, -1, -1)]
+    colln = CountingColln(groups)
+
+    group_ids = groups_helper.get_user_group_ids(colln, 'u1')
+    assert group_ids == ['g{}'.format(i) for i in range(depth, -1, -1)]
+    assert colln.find_count == 1
+
+    colln.find_count = 0
+    group_jsons = groups_helper.get_user_groups(colln, 'u1')
+    assert len(group_jsons) == depth + 1
+    assert colln.find_count == 2
+
+
+def test_user_without_groups():
+    colln = CountingColln(_chain(3))
+    assert groups_helper.get_user_group_ids(colln, 'u2') == []
+    assert groups_helper.get_user_groups(colln, 'u2') == []
+    assert colln.find_count == 2
@@ -0,0 +1,113 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from vedavaapi.common import VedavaapiService, VedavaapiServices
+
+
+class SlowOrgHandler(object):
+
+    fail = False
+
+    def __init__(self, service, org_name):
+        self.org_name = org_name
+        self.initialized = False
+        self.torn_down = False
+        self.was_reset = False
+
+    def initialize(self):
+        time.sleep(0.2)
+        if self.fail:
+            raise RuntimeError('initialization failed')
+        self.initialized = True
+
+    def teardown(self):
+        self.torn_down = True
+
+    def reset(self):
+        self.was_reset = True
+
+
+class SlowService(VedavaapiService):
+    org_handler_class = SlowOrgHandler
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(SlowOrgHandler, 'fail', False)
+    return SlowService(None, 'slow')
+
+
+def test_get_org_waits_for_eager_init_in_progress(service):
+    init_thread = threading.Thread(target=service.eager_init_org, args=('org1', ))
+    init_thread.start()
+    time.sleep(0.05)
+
+    org_handler = service.get_org('org1')
+    init_thread.join()
+    assert org_handler.initialized
+    assert service.get_org('org1') is org_handler
+    assert service.eager_init_org('org1') is None
+
+
+def test_concurrent_get_org_initializes_once(service):
+    org_handlers = []
+    threads = [threading.Thread(target=lambda: org_handlers.append(service.get_org('org1'))) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(map(id, org_handlers))) == 1
+    assert org_handlers[0].initialized
+
+
+def test_failed_init_is_not_published(service, monkeypatch):
+    monkeypatch.setattr(SlowOrgHandler, 'fail', True)
+    with pytest.raises(RuntimeError):
+        service.eager_init_org('org1')
+    assert 'org1' not in service.org_handlers
+
+    monkeypatch.setattr(SlowOrgHandler, 'fail', False)
+    assert service.get_org('org1').initialized
+
+
+def test_replaced_handler_is_torn_down(service):
+    first = service.get_org('org1')
+    service.init_org('org1')
+
+    assert first.torn_down
+    second = service.get_org('org1')
+    assert second is not first and second.initialized and not second.torn_down
+
+
+def test_reset_tears_down_and_unpublishes_handler(service):
+    first = service.get_org('org1')
+    service.reset_org('org1')
+
+    assert first.torn_down and not first.was_reset
+    assert 'org1' not in service.org_handlers
+    assert service.get_org('org1') is not first
+
+
+def test_token_resolution_is_configured_once(monkeypatch, caplog):
+    configured = []
+    monkeypatch.setitem(
+        sys.modules, 'vedavaapi.common.helpers.token_helper', types.SimpleNamespace(configure=configured.append))
+    services = {}
+    for svcname, accounts_api in (
+            ('accounts', None),
+            ('registry', {"url_root": "http://a", "resolver_mode": "local", "token_cache": {"ttl": 60}}),
+            ('gservices', {"url_root": "http://b", "resolver_mode": "remote"})):
+        service = SlowService(None, svcname)
+        if accounts_api is not None:
+            service.config['accounts_api'] = accounts_api
+        services[svcname] = service
+    monkeypatch.setattr(VedavaapiServices, 'all_services', services)
+
+    VedavaapiServices.configure_token_resolution()
+    assert configured == [{"resolver_mode": "local", "token_cache": {"ttl": 60}}]
+    assert "['gservices']" in caplog.text
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from vedavaapi.common.helpers.process_local_helper import ProcessLocal
+
+
+def test_object_is_created_once_per_process():
+    created = []
+    process_local = ProcessLocal(lambda: created.append(object()) or created[-1])
+    assert process_local.get() is process_local.get()
+    assert len(created) == 1
+
+
+def test_discard_releases_and_recreates():
+    discarded = []
+    process_local = ProcessLocal(object, on_discard=discarded.append)
+    first = process_local.get()
+
+    process_local.discard(object())  # not current one; ignored.
+    assert process_local.get() is first and discarded == []
+
+    process_local.discard(first)
+    assert discarded == [first]
+    assert process_local.get() is not first
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_process_creates_own_object():
+    discarded = []
+    process_local = ProcessLocal(object, on_discard=discarded.append)
+    parent_object = process_local.get()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            child_object = process_local.get()
+            os.write(write_fd, b'1' if child_object is not parent_object and not discarded else b'0')
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b'1'
+    os.close(read_fd)
+    assert process_local.get() is parent_object
@@ -1,12 +1,19 @@
 import logging
 import os
+import time
 
 from authlib.flask.oauth2 import ResourceProtector
+from sanskrit_ld.schema.base import ObjectPermissions
 from vedavaapi.common import VedavaapiService, OrgHandler
+from vedavaapi.common.helpers import indexes_helper
+from vedavaapi.common.helpers.cache_helper import TTLCache
 
-from .agents_helpers import bootstrap_helper, users_helper
+from .agents_helpers import bootstrap_helper, users_helper, groups_helper, password_helper
+from .agents_helpers.groups_cache_helper import UserGroupIdsCache
 from .oauth_server_helpers.authorization_server import AuthorizationServer
-from .oauth_server_helpers.models import create_bearer_token_validator
+from .oauth_server_helpers.compaction_helper import OAuthCollnCompactor
+from .oauth_server_helpers.models import create_bearer_token_validator, get_revoked_token_hashes
+from .oauth_server_helpers.token_signer import TokenSigner
 
 
 logging.basicConfig(
@@ -15,6 +22,36 @@ logging.basicConfig(
 )
 
 
+def _read_permission_indexes():
+    # agent sets over which listings are filtered for read permission.
+    fields = [
+        'permissions.{}.{}.{}'.format(ObjectPermissions.READ, status, agent_set)
+        for status in ('granted', 'withdrawn') for agent_set in ('users', 'groups')
+    ]
+    return [indexes_helper.index_spec(field, (field, 1)) for field in fields]
+
+
+users_colln_indexes = [
+    indexes_helper.index_spec('email', ('email', 1)),
+    indexes_helper.index_spec('groupName', ('groupName', 1)),
+    indexes_helper.index_spec('members', ('members', 1)),
+    indexes_helper.index_spec('ancestors', ('ancestors', 1)),
+    indexes_helper.index_spec(
+        'externalAuthentications', ('externalAuthentications.provider', 1), ('externalAuthentications.uid', 1)),
+    indexes_helper.index_spec('counter', ('counter', 1)),
+    indexes_helper.index_spec('marker', ('marker', 1)),
+] + _read_permission_indexes()
+
+oauth_colln_indexes = [
+    indexes_helper.index_spec('access_token', ('access_token', 1)),
+    indexes_helper.index_spec('refresh_token', ('refresh_token', 1)),
+    indexes_helper.index_spec('code_client_id', ('code', 1), ('client_id', 1)),
+    indexes_helper.index_spec('client_id_jsonClass', ('client_id', 1), ('jsonClass', 1)),
+    indexes_helper.index_spec('jsonClass_revoked', ('jsonClass', 1), ('revoked', 1)),
+    indexes_helper.index_spec('purge_at', ('purge_at', 1), expireAfterSeconds=0),
+]
+
+
 class AccountsOrgHandler(OrgHandler):
     def __init__(self, service, org_name):
         super(AccountsOrgHandler, self).__init__(service, org_name)
@@ -23,18 +60,38 @@ class AccountsOrgHandler(OrgHandler):
 
         self.users_colln = self.users_db.get_collection(self.users_db_config['collections']['users'])
         self.oauth_colln = self.users_db.get_collection(self.users_db_config['collections']['oauth'])
+        self.user_groups_cache = UserGroupIdsCache.from_config(
+            self.users_colln, self.service.config.get('user_groups_cache', {}))
 
         self.authlib_config = self.service.config['authlib']
-        self.authlib_authorization_server = AuthorizationServer(self.authlib_config, self.oauth_colln, self.users_colln)
+        self.signed_tokens_config = self.service.config.get('signed_tokens', {})
+        self.token_signer = None
+        if self.signed_tokens_config.get('enabled', False):
+            self.token_signer = TokenSigner.from_config(
+                self.signed_tokens_config, self.store, self.user_groups_cache.get_user_group_ids)
+        client_cache_config = self.service.config.get('client_cache', {})
+        self.client_cache = TTLCache(
+            max_size=client_cache_config.get('max_size', 1000), ttl=client_cache_config.get('ttl', 300))
+        self.authlib_authorization_server = AuthorizationServer(
+            self.authlib_config, self.oauth_colln, self.users_colln,
+            token_signer=self.token_signer, client_cache=self.client_cache)
+
+        self.compaction_config = self.service.config.get('oauth_compaction', {})
+        self.oauth_colln_compactor = OAuthCollnCompactor(
+            self.oauth_colln, interval=self.compaction_config.get('interval', 3600),
+            batch_size=self.compaction_config.get('batch_size', 1000),
+            revoked_grace=self.token_signer.claims_ttl if self.token_signer else 0, label=self.org_name)
 
         bearer_validator = create_bearer_token_validator(self.oauth_colln)
+        self.bearer_token_validator = bearer_validator()
         self.resource_protector = ResourceProtector()
-        self.resource_protector.register_token_validator(bearer_validator())
+        self.resource_protector.register_token_validator(self.bearer_token_validator)
 
     def initialize(self):
-        self.users_colln.create_index(keys_dict={
-            "email": 1
-        }, index_name="email")
+        indexes_helper.ensure_indexes(self.users_colln, users_colln_indexes)
+        indexes_helper.ensure_indexes(self.oauth_colln, oauth_colln_indexes)
+        indexes_helper.check_indexes(self.users_colln, users_colln_indexes, '{}/users'.format(self.org_name))
+        indexes_helper.check_indexes(self.oauth_colln, oauth_colln_indexes, '{}/oauth'.format(self.org_name))
 
         initial_agents_config = self.service.config["initial_agents"].copy()
         initial_agents_config['users']['root_admin'].update(self.org_config['root_admin'])
@@ -46,6 +103,45 @@ class AccountsOrgHandler(OrgHandler):
             self.users_colln, self.oauth_colln, initial_agents_config
         )
 
+        if groups_helper.needs_ancestors_backfill(self.users_colln):
+            logging.info("Backfill ancestors of groups.")
+            groups_helper.backfill_group_ancestors(self.users_colln)
+
+        if self.compaction_config.get('enabled', True):
+            self.oauth_colln_compactor.start()
+
+    def teardown(self):
+        self.oauth_colln_compactor.stop()
+
+    def token_doc(self, token):
+        token_doc = token.to_json_map()
+        if hasattr(token, 'user_id'):
+            token_doc['group_ids'] = self.user_groups_cache.get_user_group_ids(token.user_id)
+        return token_doc
+
+    def resolve_token(self, token_string):
+        """
+        in-process equivalent of oauth/v1/resolve_token endpoint.
+        :return: token doc, or None if token is invalid, expired or revoked.
+        """
+        token = self.bearer_token_validator.authenticate_token(token_string)
+        if token is None:
+            return None
+        if token.get_expires_at() < time.time() or self.bearer_token_validator.token_revoked(token):
+            return None
+        return self.token_doc(token)
+
+    def oauth_colln_stats(self):
+        return self.oauth_colln_compactor.collection_stats()
+
+    def jwks(self):
+        if self.token_signer is None:
+            return None
+        return self.token_signer.jwks()
+
+    def revoked_token_hashes(self):
+        return get_revoked_token_hashes(self.oauth_colln)
+
 
 class VedavaapiAccounts(VedavaapiService):
     instance = None
@@ -59,6 +155,7 @@ class VedavaapiAccounts(VedavaapiService):
         super(VedavaapiAccounts, self).__init__(registry, name, conf)
         os.environ['AUTHLIB_INSECURE_TRANSPORT'] = self.config.get(
             'authlib', {}).get('AUTHLIB_INSECURE_TRANSPORT', '0')
+        password_helper.configure(self.config.get('password_hashing', {}))
 
     def get_users_colln(self, org_name):
         return self.get_org(org_name).users_colln
@@ -75,14 +172,32 @@ class VedavaapiAccounts(VedavaapiService):
     def get_resource_protector(self, org_name):
         return self.get_org(org_name).resource_protector
 
+    def resolve_token(self, org_name, token_string):
+        return self.get_org(org_name).resolve_token(token_string)
+
+    def get_user_group_ids(self, org_name, user_id):
+        return self.get_org(org_name).user_groups_cache.get_user_group_ids(user_id)
+
+    def jwks(self, org_name):
+        return self.get_org(org_name).jwks()
+
+    def revoked_token_hashes(self, org_name):
+        return self.get_org(org_name).revoked_token_hashes()
+
+    def password_hashing_stats(self):
+        return password_helper.stats()
+
     def get_initial_agents(self, org_name):
         initial_agents = self.get_org(org_name).initial_agents  # type: bootstrap_helper.InitialAgents
         return initial_agents
 
     def get_external_oauth_clients_config(self, org_name, provider_name):
         oauth_config = self.config['external_oauth_clients']
-        provider_specific_config = oauth_config.get(provider_name, {})
-        provider_specific_config['client_secret_file_path'] = self.registry.lookup('credentials').creds_path(
+        # copied, as parsed secret shouldn't leak into service config
+        provider_specific_config = dict(oauth_config.get(provider_name, {}))
+        credentials_service = self.registry.lookup('credentials')
+        provider_specific_config['client_secret_file_path'] = credentials_service.creds_path(
             org_name, 'oauth', provider_name, client_name=provider_specific_config.get('client_name', None))
-        print('psoc', provider_specific_config)
+        provider_specific_config['client_secret_json'] = credentials_service.load_creds(
+            provider_specific_config['client_secret_file_path'])
         return provider_specific_config
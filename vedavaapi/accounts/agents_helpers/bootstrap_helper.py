@@ -1,3 +1,6 @@
+import hashlib
+import json
+import time
 from collections import namedtuple
 
 from sanskrit_ld.schema import WrapperObject
@@ -14,8 +17,73 @@ InitialAgents = namedtuple(
     'InitialAgents', ('root_admin_id', 'all_users_group_id', 'root_admins_group_id', 'root_client_id'))
 
 
+'''
+bootstrap marker; records ids of initial agents, once they are bootstrapped,
+so that later initializations with same config take a single read.
+'''
+
+# bump whenever bootstrap logic changes, so that existing deployments re-bootstrap once.
+BOOTSTRAP_VERSION = 1
+
+_bootstrap_marker_selector_doc = {"marker": "bootstrap"}
+
+
+def initial_agents_config_hash(initial_agents_config):
+    return hashlib.sha256(
+        json.dumps(initial_agents_config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_bootstrapped_initial_agents(users_colln, config_hash):
+    """
+    :return: InitialAgents recorded by bootstrap marker, or None if there is no marker of current version and config.
+    """
+    marker_json = users_colln.find_one(
+        _bootstrap_marker_selector_doc, projection={"version": 1, "config_hash": 1, "initial_agents": 1})
+    if marker_json is None:
+        return None
+    if marker_json.get('version', None) != BOOTSTRAP_VERSION or marker_json.get('config_hash', None) != config_hash:
+        return None
+    try:
+        return InitialAgents(**marker_json['initial_agents'])
+    except (KeyError, TypeError):
+        return None
+
+
+def save_bootstrap_marker(users_colln, config_hash, initial_agents):
+    users_colln.update_one(
+        _bootstrap_marker_selector_doc,
+        {"$set": {
+            "version": BOOTSTRAP_VERSION,
+            "config_hash": config_hash,
+            "initial_agents": dict(initial_agents._asdict()),
+            "bootstrapped_at": time.time()
+        }},
+        upsert=True)
+
+
+def delete_bootstrap_marker(users_colln):
+    users_colln.delete_one(_bootstrap_marker_selector_doc)
+
+
+def bootstrap_initial_agents(users_colln, oauth_colln, initial_agents_config, force=False):
+    """
+    if initial agents were already bootstrapped with same config, returns their recorded ids.
+    otherwise (or if force), bootstraps them, and records a marker.
+    to re-bootstrap with same config, for example after initial agents were deleted, delete marker.
+    """
+    config_hash = initial_agents_config_hash(initial_agents_config)
+    if not force:
+        initial_agents = get_bootstrapped_initial_agents(users_colln, config_hash)
+        if initial_agents is not None:
+            return initial_agents
+
+    initial_agents = _bootstrap_initial_agents(users_colln, oauth_colln, initial_agents_config)
+    save_bootstrap_marker(users_colln, config_hash, initial_agents)
+    return initial_agents
+
+
 # noinspection PyUnusedLocal,PyProtectedMember
-def bootstrap_initial_agents(users_colln, oauth_colln, initial_agents_config):
+def _bootstrap_initial_agents(users_colln, oauth_colln, initial_agents_config):
     root_admin_conf = initial_agents_config['users']['root_admin']
     root_admin_id = create_root_admin(users_colln, root_admin_conf['email'], root_admin_conf['hashedPassword'])
 
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from vedavaapi.common.helpers.cache_helper import TTLCache
+
+from . import groups_helper
+
+
+class UserGroupIdsCache(object):
+    """
+    per org cache of user_id -> effective group ids.
+    whole cache is dropped, whenever groups generation counter in db moves,
+    which is bumped by every change in group memberships or hierarchy, from any process.
+    """
+
+    def __init__(self, groups_colln, max_size=10000, ttl=3600, generation_check_interval=0):
+        self.groups_colln = groups_colln
+        self.generation_check_interval = generation_check_interval
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._generation = None
+        self._generation_checked_at = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, groups_colln, cache_config):
+        return cls(
+            groups_colln, max_size=cache_config.get('max_size', 10000), ttl=cache_config.get('ttl', 3600),
+            generation_check_interval=cache_config.get('generation_check_interval', 0))
+
+    def _sync_generation(self):
+        now = time.time()
+        if now - self._generation_checked_at < self.generation_check_interval:
+            return self._generation
+
+        generation = groups_helper.get_groups_generation(self.groups_colln)
+        with self._lock:
+            if generation != self._generation:
+                self._cache.clear()
+                self._generation = generation
+            self._generation_checked_at = now
+        return generation
+
+    def get_user_group_ids(self, user_id):
+        generation = self._sync_generation()
+        group_ids = self._cache.get(user_id)
+        if group_ids is not None:
+            return list(group_ids)
+
+        group_ids = groups_helper.get_user_group_ids(self.groups_colln, user_id)
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(user_id, tuple(group_ids))
+        return group_ids
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._generation_checked_at = 0
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats['generation'] = self._generation
+        return stats
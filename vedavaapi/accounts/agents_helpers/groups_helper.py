@@ -26,48 +26,198 @@ def get_group_id(groups_colln, group_name):
     return group._id if group else None
 
 
-def get_group_hierarchy(groups_colln, group_json, groups_projection=None):
+def get_groups_ancestry(groups_colln, group_jsons, groups_projection=None):
+    """
+    walks up hierarchies of all given groups together, breadth first, fetching each level with one query.
+    round trips are bounded by depth of hierarchy, instead of number of groups.
+    :return: ancestor group jsons, nearest levels first, deduplicated, and excluding given groups.
+    """
     groups_projection = projection_helper.modified_projection(
         groups_projection, mandatory_attrs=["_id", "source"]
     )
 
-    group_hierarchy = []
-    parent_group_id = group_json.get('source', None)
-    if not parent_group_id:
-        return group_hierarchy
+    visited_ids = set(group_json['_id'] for group_json in group_jsons)
+    ancestor_jsons = []
+    level_jsons = group_jsons
+
+    while True:
+        level_source_ids = set(group_json.get('source', None) for group_json in level_jsons)
+        frontier_ids = [group_id for group_id in level_source_ids if group_id and group_id not in visited_ids]
+        if not frontier_ids:
+            break
+        visited_ids.update(frontier_ids)
+
+        level_jsons = list(groups_colln.find(
+            {"jsonClass": UsersGroup.json_class, "_id": {"$in": frontier_ids}}, projection=groups_projection))
+        ancestor_jsons.extend(level_jsons)
 
-    parent_group_json = groups_colln.find_one(
-        get_group_selector_doc(_id=parent_group_id), projection=groups_projection)
-    if parent_group_json is None:
-        return group_hierarchy
+    return ancestor_jsons
 
-    group_hierarchy.append(parent_group_json)
 
-    parent_group_hierarchy = get_group_hierarchy(
-        groups_colln, parent_group_json, groups_projection=groups_projection)
-    group_hierarchy.extend(parent_group_hierarchy)
+def get_group_hierarchy(groups_colln, group_json, groups_projection=None):
+    return get_groups_ancestry(groups_colln, [group_json], groups_projection=groups_projection)
+
+
+def get_group_ancestor_ids(groups_colln, source_id):
+    """
+    ancestors of a group with given source, nearest first.
+    """
+    if not source_id:
+        return []
+    source_json = groups_colln.find_one(
+        get_group_selector_doc(_id=source_id), projection={"_id": 1, "source": 1, "ancestors": 1})
+    if source_json is None:
+        return []
+    if 'ancestors' in source_json:
+        return [source_id] + source_json['ancestors']
+    return [source_id] + [
+        group_json['_id'] for group_json in get_group_hierarchy(
+            groups_colln, source_json, groups_projection={"_id": 1})
+    ]
+
+
+def _explicit_groups_and_ancestor_ids(groups_colln, user_id, groups_projection):
+    explicit_group_jsons = list(groups_colln.find(
+        {"jsonClass": UsersGroup.json_class, "members": user_id}, projection=groups_projection
+    ))
 
-    return group_hierarchy
+    ancestor_ids = []
+    unmaterialized_group_jsons = []  # not yet backfilled
+    for group_json in explicit_group_jsons:
+        if 'ancestors' in group_json:
+            ancestor_ids.extend(group_json['ancestors'])
+        else:
+            unmaterialized_group_jsons.append(group_json)
+
+    if unmaterialized_group_jsons:
+        ancestor_ids.extend([
+            group_json['_id'] for group_json in get_groups_ancestry(
+                groups_colln, unmaterialized_group_jsons, groups_projection={"_id": 1})
+        ])
+    return explicit_group_jsons, ancestor_ids
 
 
 def get_user_groups(groups_colln, user_id, groups_projection=None):
     groups_projection = projection_helper.modified_projection(
-        groups_projection, mandatory_attrs=["_id", "source"]
+        groups_projection, mandatory_attrs=["_id", "source", "ancestors"]
     )
 
-    group_id_jsons_map = {}
-    explicit_group_jsons = groups_colln.find(
-        {"jsonClass": UsersGroup.json_class, "members": user_id}, projection=groups_projection
-    )
-    group_id_jsons_map.update(dict((group_json['_id'], group_json) for group_json in explicit_group_jsons))
+    explicit_group_jsons, ancestor_ids = _explicit_groups_and_ancestor_ids(groups_colln, user_id, groups_projection)
+    group_id_jsons_map = dict((group_json['_id'], group_json) for group_json in explicit_group_jsons)
 
-    for group_json in explicit_group_jsons:
-        group_hierarchy = get_group_hierarchy(groups_colln, group_json, groups_projection=groups_projection)
-        group_id_jsons_map.update(dict((group_json['_id'], group_json) for group_json in group_hierarchy))
+    missing_ancestor_ids = list(set(ancestor_ids) - set(group_id_jsons_map.keys()))
+    if missing_ancestor_ids:
+        ancestor_group_jsons = groups_colln.find(
+            {"jsonClass": UsersGroup.json_class, "_id": {"$in": missing_ancestor_ids}}, projection=groups_projection)
+        group_id_jsons_map.update(dict((group_json['_id'], group_json) for group_json in ancestor_group_jsons))
 
     return list(group_id_jsons_map.values())
 
 
+def get_user_group_ids(groups_colln, user_id):
+    explicit_group_jsons, ancestor_ids = _explicit_groups_and_ancestor_ids(
+        groups_colln, user_id, {"_id": 1, "source": 1, "ancestors": 1})
+
+    group_ids = []
+    for group_id in [group_json['_id'] for group_json in explicit_group_jsons] + ancestor_ids:
+        if group_id not in group_ids:
+            group_ids.append(group_id)
+    return group_ids
+
+
+'''
+groups generation counter; bumped on every change in group memberships or hierarchy,
+so that caches of effective groups in any process can detect staleness.
+'''
+
+_groups_generation_selector_doc = {"counter": "groups_generation"}
+
+
+def get_groups_generation(groups_colln):
+    counter_json = groups_colln.find_one(_groups_generation_selector_doc, projection={"generation": 1})
+    return counter_json.get('generation', 0) if counter_json else 0
+
+
+def bump_groups_generation(groups_colln):
+    groups_colln.update_one(_groups_generation_selector_doc, {"$inc": {"generation": 1}}, upsert=True)
+
+
+'''
+functions for maintaining materialized group ancestry
+'''
+
+
+def validate_group_source(groups_colln, group_id, source_id):
+    if source_id == group_id or group_id in get_group_ancestor_ids(groups_colln, source_id):
+        raise ObjModelException('group cannot be source of it\'s own ancestor', 403)
+
+
+def update_group_ancestors(groups_colln, group_id):
+    """
+    recomputes ancestors of group, and of all of it's descendants. should be called whenever source of group changes.
+    :return: number of groups updated
+    """
+    group_json = groups_colln.find_one(get_group_selector_doc(_id=group_id), projection={"_id": 1, "source": 1})
+    if group_json is None:
+        return 0
+
+    ancestor_ids = get_group_ancestor_ids(groups_colln, group_json.get('source', None))
+    groups_colln.update_one(get_group_selector_doc(_id=group_id), {"$set": {"ancestors": ancestor_ids}})
+
+    descendant_jsons = list(groups_colln.find(
+        {"jsonClass": UsersGroup.json_class, "ancestors": group_id}, projection={"_id": 1, "ancestors": 1}))
+    for descendant_json in descendant_jsons:
+        old_ancestor_ids = descendant_json['ancestors']
+        new_ancestor_ids = old_ancestor_ids[:old_ancestor_ids.index(group_id) + 1] + ancestor_ids
+        groups_colln.update_one(
+            get_group_selector_doc(_id=descendant_json['_id']), {"$set": {"ancestors": new_ancestor_ids}})
+
+    bump_groups_generation(groups_colln)
+    return len(descendant_jsons) + 1
+
+
+def remove_from_group_ancestors(groups_colln, deleted_group_ids):
+    if not deleted_group_ids:
+        return 0
+    response = groups_colln.update_many(
+        {"jsonClass": UsersGroup.json_class, "ancestors": {"$in": deleted_group_ids}},
+        {"$pull": {"ancestors": {"$in": deleted_group_ids}}})
+    bump_groups_generation(groups_colln)
+    return response.modified_count
+
+
+def needs_ancestors_backfill(groups_colln):
+    return groups_colln.find_one(
+        {"jsonClass": UsersGroup.json_class, "ancestors": {"$exists": False}}, projection={"_id": 1}) is not None
+
+
+def backfill_group_ancestors(groups_colln):
+    """
+    migration: computes ancestors of all groups of an org in memory, and sets them where they differ.
+    :return: number of groups updated
+    """
+    group_jsons = list(groups_colln.find(
+        {"jsonClass": UsersGroup.json_class}, projection={"_id": 1, "source": 1, "ancestors": 1}))
+    group_sources_map = dict((group_json['_id'], group_json.get('source', None)) for group_json in group_jsons)
+
+    modified_count = 0
+    for group_json in group_jsons:
+        ancestor_ids = []
+        source_id = group_sources_map[group_json['_id']]
+        while source_id in group_sources_map and source_id not in ancestor_ids and source_id != group_json['_id']:
+            ancestor_ids.append(source_id)
+            source_id = group_sources_map[source_id]
+
+        if group_json.get('ancestors', None) == ancestor_ids:
+            continue
+        groups_colln.update_one(get_group_selector_doc(_id=group_json['_id']), {"$set": {"ancestors": ancestor_ids}})
+        modified_count += 1
+
+    if modified_count:
+        bump_groups_generation(groups_colln)
+    return modified_count
+
+
 '''
 functions for creating group
 '''
@@ -79,7 +229,7 @@ def insert_new_group(groups_colln, group):
 
 
 def create_new_group(groups_colln, group_json, user_id, user_group_ids, initial_agents=None, ignore_source=False):
-    for k in ('_id', 'members'):
+    for k in ('_id', 'members', 'ancestors'):
         if k in group_json:
             raise ObjModelException('you cannot set "{}" attribute.', 403)
 
@@ -106,6 +256,10 @@ def create_new_group(groups_colln, group_json, user_id, user_group_ids, initial_
     new_group_id = objstore_helper.create_resource(
         groups_colln, group.to_json_map(), user_id, user_group_ids,
         initial_agents=initial_agents, standalone=ignore_source)
+    groups_colln.update_one(
+        get_group_selector_doc(_id=new_group_id),
+        {"$set": {"ancestors": get_group_ancestor_ids(groups_colln, group_json.get('source', None))}})
+    bump_groups_generation(groups_colln)
     return new_group_id
 
 
@@ -128,6 +282,7 @@ def add_users_to_group(users_colln, group_selector_doc, user_ids, current_user_i
 
     update_doc = {"$addToSet": {"members": {"$each": user_ids}}}
     response = users_colln.update_one(group_selector_doc, update_doc)
+    bump_groups_generation(users_colln)
 
     return response.modified_count
 
@@ -145,5 +300,6 @@ def remove_users_from_group(users_colln, group_selector_doc, user_ids, current_u
 
     update_doc = {"$pull": {"members": {"$in": user_ids}}}
     response = users_colln.update_one(group_selector_doc, update_doc)
+    bump_groups_generation(users_colln)
 
     return response.modified_count
@@ -0,0 +1,138 @@
+"""
+bcrypt hashing and verification of passwords, offloaded to a bounded process pool,
+so that a burst of sign ins doesn't stall request threads of a worker.
+hashes with a cost other than configured "rounds" are upgraded in background, after a successful check.
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from vedavaapi.common.helpers.process_local_helper import ProcessLocal
+from vedavaapi.objectdb.helpers import ObjModelException
+
+
+password_hashing_config = {
+    "rounds": 12,  # bcrypt work factor (log2 of iterations), 4 to 31
+    "workers": 2,  # 0 hashes on calling thread itself
+    "max_queue": 16,  # operations allowed to wait for a worker, beyond those being run
+    "timeout": 30
+}
+
+_process_pool = ProcessLocal(
+    lambda: ProcessPoolExecutor(max_workers=password_hashing_config['workers']),
+    on_discard=lambda executor: executor.shutdown(wait=False))
+_slots = threading.BoundedSemaphore(password_hashing_config['workers'] + password_hashing_config['max_queue'])
+
+_rehash_executor = ThreadPoolExecutor(max_workers=1)
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+_bcrypt_hash_regex = re.compile(r'^\$2[abxy]?\$(?P<rounds>\d{2})\$')
+
+
+def configure(config):
+    global _slots
+    rounds = config.get('rounds', password_hashing_config['rounds'])
+    if not isinstance(rounds, int) or not 4 <= rounds <= 31:
+        raise ValueError('invalid password_hashing.rounds: {}'.format(rounds))
+    password_hashing_config.update(config)
+    _slots = threading.BoundedSemaphore(
+        max(password_hashing_config['workers'], 1) + password_hashing_config['max_queue'])
+    _process_pool.discard()
+
+
+def _record(operation, duration=None, rejected=False):
+    with _stats_lock:
+        op_stats = _stats.setdefault(operation, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rejected": 0})
+        if rejected:
+            op_stats['rejected'] += 1
+            return
+        duration_ms = duration * 1000
+        op_stats['count'] += 1
+        op_stats['total_ms'] += duration_ms
+        op_stats['max_ms'] = max(op_stats['max_ms'], duration_ms)
+
+
+def stats():
+    with _stats_lock:
+        return dict(
+            (operation, dict(op_stats, mean_ms=(op_stats['total_ms'] / op_stats['count']) if op_stats['count'] else 0))
+            for (operation, op_stats) in _stats.items())
+
+
+def _run(operation, func, *args):
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        _record(operation, rejected=True)
+        raise ObjModelException('too many password operations in progress, retry later', 429)
+
+    start_time = time.time()
+    try:
+        if not password_hashing_config['workers']:
+            return func(*args)
+        executor = _process_pool.get()
+        try:
+            return executor.submit(func, *args).result(timeout=password_hashing_config['timeout'])
+        except BrokenProcessPool:
+            _process_pool.discard(executor)
+            return _process_pool.get().submit(func, *args).result(timeout=password_hashing_config['timeout'])
+    except TimeoutError:
+        raise ObjModelException('password operation timed out', 503)
+    finally:
+        slots.release()
+        _record(operation, duration=time.time() - start_time)
+
+
+# following two are run in pool workers, hence module level, and over bytes.
+
+def _hashpw(password_bytes, rounds):
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _checkpw(password_bytes, hashed_password_bytes):
+    return bcrypt.checkpw(password_bytes, hashed_password_bytes)
+
+
+def hash_password(password):
+    """
+    :raises ObjModelException: with code 429, if pool is saturated, or 503 on timeout.
+    """
+    return _run('hash', _hashpw, password.encode('utf-8'), password_hashing_config['rounds'])
+
+
+def hash_rounds(hashed_password):
+    match = _bcrypt_hash_regex.match(hashed_password or '')
+    return int(match.group('rounds')) if match else None
+
+
+def needs_rehash(hashed_password):
+    return hash_rounds(hashed_password) != password_hashing_config['rounds']
+
+
+def _rehash(password, hashed_password, on_rehash):
+    start_time = time.time()
+    try:
+        new_hashed_password = hash_password(password)
+        on_rehash(new_hashed_password, hashed_password)
+        _record('rehash', duration=time.time() - start_time)
+    except Exception as e:
+        # will be retried on next successful check.
+        logging.warning('rehash of password failed: {}'.format(e))
+
+
+def check_password(password, hashed_password, on_rehash=None):
+    """
+    :param on_rehash: callback(new_hashed_password, old_hashed_password), to persist upgraded hash.
+        if given, and check succeeds on a hash with different cost, password is rehashed in background.
+    :raises ObjModelException: with code 429, if pool is saturated, or 503 on timeout.
+    """
+    matches = _run('check', _checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+    if matches and on_rehash is not None and needs_rehash(hashed_password):
+        _rehash_executor.submit(_rehash, password, hashed_password, on_rehash)
+    return matches
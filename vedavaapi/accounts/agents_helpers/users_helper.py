@@ -1,6 +1,3 @@
-import sys
-
-import bcrypt
 from sanskrit_ld.helpers import permissions_helper
 
 from sanskrit_ld.schema import JsonObject, WrapperObject
@@ -9,6 +6,8 @@ from sanskrit_ld.schema.users import User
 
 from vedavaapi.objectdb.helpers import ObjModelException, projection_helper, objstore_helper
 
+from . import password_helper
+
 
 def get_user_selector_doc(_id=None, email=None, external_provider=None, external_uid=None):
     if _id is not None:
@@ -87,9 +86,22 @@ def get_provider_uid(user, provider_name):
     return None
 
 
-def check_password(user, password):
-    print(user.hashedPassword, password, file=sys.stderr)
-    return bcrypt.checkpw(password.encode('utf-8'), user.hashedPassword.encode('utf-8'))
+def password_rehash_callback(users_colln, user_id):
+    def on_rehash(new_hashed_password, old_hashed_password):
+        # conditional on old hash, so that a password changed meanwhile is not overwritten.
+        users_colln.update_one(
+            {"_id": user_id, "hashedPassword": old_hashed_password},
+            {"$set": {"hashedPassword": new_hashed_password}})
+    return on_rehash
+
+
+def check_password(user, password, users_colln=None):
+    """
+    :param users_colln: if given, hash of user's password is upgraded to configured cost, if it differs.
+    """
+    # noinspection PyProtectedMember
+    on_rehash = password_rehash_callback(users_colln, user._id) if users_colln is not None else None
+    return password_helper.check_password(password, user.hashedPassword, on_rehash=on_rehash)
 
 
 '''
@@ -115,8 +127,7 @@ def create_new_user(users_colln, user_json, initial_agents=None, with_password=T
         raise ObjModelException('invalid jsonClass', 403)
 
     if with_password:
-        user_json['hashedPassword'] = bcrypt.hashpw(
-            user_json['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        user_json['hashedPassword'] = password_helper.hash_password(user_json['password'])
         user_json.pop('password')
 
     existing_user = get_user(
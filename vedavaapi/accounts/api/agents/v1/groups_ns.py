@@ -84,16 +84,19 @@ class Groups(flask_restplus.Resource):
             return error_response(message='ids should be strings', code=404)
 
         delete_report = []
+        all_deleted_res_ids = []
 
         for group_id in group_ids:
             deleted, deleted_res_ids = objstore_helper.delete_tree(
                 g.users_colln, group_id, current_token.user_id, current_token.group_ids)
+            all_deleted_res_ids.extend(deleted_res_ids)
 
             delete_report.append({
                 "deleted": deleted,
                 "deleted_resource_ids": deleted_res_ids
             })
 
+        groups_helper.remove_from_group_ancestors(g.users_colln, all_deleted_res_ids)
         return delete_report
 
 
@@ -177,12 +180,16 @@ class GroupResource(flask_restplus.Resource):
             return_projection, mandatory_attrs=['_id', 'jsonClass'])
 
         try:
+            if 'source' in update_doc:
+                groups_helper.validate_group_source(g.users_colln, update_doc['_id'], update_doc['source'])
             group_update = JsonObject.make_from_dict(update_doc)
             updated_group_id = objstore_helper.update_resource(
                 g.users_colln, group_update.to_json_map(), current_token.user_id, current_token.group_ids,
-                not_allowed_attributes=['members', 'groupName'])
+                not_allowed_attributes=['members', 'groupName', 'ancestors'])
             if updated_group_id is None:
                 raise ObjModelException('group not exist', 404)
+            if 'source' in update_doc:
+                groups_helper.update_group_ancestors(g.users_colln, updated_group_id)
         except ObjModelException as e:
             return error_response(message=e.message, code=e.http_response_code)
         except ValueError as e:
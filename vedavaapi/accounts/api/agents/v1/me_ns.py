@@ -1,4 +1,3 @@
-import bcrypt
 from flask import g
 import flask_restplus
 
@@ -10,8 +9,8 @@ from vedavaapi.common.helpers.token_helper import require_oauth, current_token
 
 from . import api
 from .users_ns import _validate_projection
-from ... import sign_out_user
-from ....agents_helpers import users_helper, groups_helper
+from ... import sign_out_user, myservice
+from ....agents_helpers import users_helper, groups_helper, password_helper
 
 me_ns = api.namespace('me', path='/me', description='personalization namespace')
 
@@ -60,10 +59,7 @@ class Me(flask_restplus.Resource):
     @require_oauth(token_required=False)
     def post(self):
         user_id = resolve_user_id()
-        group_ids = [
-            group['_id'] for group in groups_helper.get_user_groups(
-                g.users_colln, user_id, groups_projection={"_id": 1})
-        ]
+        group_ids = myservice().get_user_group_ids(g.current_org_name, user_id)
 
         args = self.post_parser.parse_args()
         update_doc = jsonify_argument(args['update_doc'], key='update_doc')
@@ -79,8 +75,10 @@ class Me(flask_restplus.Resource):
             return error_response(message='invalid jsonClass', code=403)
 
         if 'password' in update_doc:
-            update_doc['hashedPassword'] = bcrypt.hashpw(
-                update_doc['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            try:
+                update_doc['hashedPassword'] = password_helper.hash_password(update_doc['password'])
+            except ObjModelException as e:
+                return error_response(message=e.message, code=e.http_response_code)
             update_doc.pop('password')
 
         return_projection = jsonify_argument(args.get('return_projection', None), key='return_projection')
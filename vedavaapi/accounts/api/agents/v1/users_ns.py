@@ -10,6 +10,7 @@ from sanskrit_ld.schema.base import ObjectPermissions
 from vedavaapi.accounts.agents_helpers import groups_helper
 from vedavaapi.objectdb.helpers import ObjModelException, projection_helper, objstore_helper
 
+from vedavaapi.common.helpers import permissions_helper
 from vedavaapi.common.helpers.api_helper import jsonify_argument, check_argument_type, error_response, abort_with_error_response
 from vedavaapi.common.helpers.token_helper import require_oauth, current_token
 
@@ -52,7 +53,7 @@ def get_requested_agents(args, colln, user_id, group_ids, filter_doc=None):
         ops['limit'] = [args['count']]
 
     try:
-        resource_repr_jsons = objstore_helper.get_read_permitted_resource_jsons(
+        resource_repr_jsons = permissions_helper.get_read_permitted_resource_jsons(
             colln, user_id, group_ids, selector_doc, projection=projection, ops=ops)
     except (TypeError, ValueError):
         error = error_response(message='arguments to operations seems invalid', code=400)
@@ -259,14 +260,11 @@ class UserGroups(flask_restplus.Resource):
             return error_response(message='permission denied', code=403)
 
         user_group_jsons = groups_helper.get_user_groups(g.users_colln, user_id, groups_projection=None)
-        permitted_user_group_jsons = []
+        permitted_user_group_jsons = permissions_helper.filter_permitted(
+            g.users_colln, user_group_jsons, ObjectPermissions.READ, current_token.user_id, current_token.group_ids)
 
-        for group_json in user_group_jsons:
-            if PermissionResolver.resolve_permission(
-                group_json, ObjectPermissions.READ, current_token.user_id, current_token.group_ids, g.users_colln):
-
-                projection_helper.project_doc(group_json, groups_projection, in_place=True)
-                permitted_user_group_jsons.append(group_json)
+        for group_json in permitted_user_group_jsons:
+            projection_helper.project_doc(group_json, groups_projection, in_place=True)
 
         return permitted_user_group_jsons, 200
 
@@ -6,9 +6,9 @@ import flask_restplus
 import furl
 from authlib.flask.oauth2 import current_token
 from authlib.specs.rfc6749 import OAuth2Error
-from vedavaapi.accounts.agents_helpers import groups_helper
 
 from vedavaapi.common.helpers.api_helper import error_response, abort_with_error_response, get_current_org
+from vedavaapi.objectdb.helpers import ObjModelException
 
 from . import api
 from ... import sign_out_user, myservice, require_oauth
@@ -113,7 +113,11 @@ class SignIn(flask_restplus.Resource):
 
         if not hasattr(user, 'hashedPassword'):
             return error_response(message='user doesn\'t have vedavaapi account', code=403)
-        if not users_helper.check_password(user, password):
+        try:
+            password_matches = users_helper.check_password(user, password, users_colln=g.users_colln)
+        except ObjModelException as e:
+            return error_response(message=e.message, code=e.http_response_code)
+        if not password_matches:
             return error_response(message='incorrect password', code=401)
 
         session['authentications'] = session.get('authentications', {})
@@ -244,13 +248,24 @@ class TokenResolver(flask_restplus.Resource):
         print(current_token)
         args = self.get_parser.parse_args()
 
-        token_doc = token.to_json_map()
-        if hasattr(token, 'user_id'):
-            group_ids = [
-                group['_id'] for group in groups_helper.get_user_groups(
-                    g.users_colln, token.user_id, groups_projection={"_id": 1}
-                )
-            ]
-            token_doc['group_ids'] = group_ids
-
+        token_doc = myservice().get_org(g.current_org_name).token_doc(token)
         return token_doc, 200
+
+
+# noinspection PyMethodMayBeStatic
+@authorization_ns.route('/jwks')
+class KeySet(flask_restplus.Resource):
+
+    def get(self):
+        jwks = myservice().jwks(g.current_org_name)
+        if jwks is None:
+            return error_response(message='signed tokens are not enabled', code=404)
+        return jwks, 200
+
+
+# noinspection PyMethodMayBeStatic
+@authorization_ns.route('/revoked_tokens')
+class RevokedTokens(flask_restplus.Resource):
+
+    def get(self):
+        return {"token_hashes": myservice().revoked_token_hashes(g.current_org_name)}, 200
@@ -2,11 +2,11 @@ import flask_restplus
 from flask import g, request
 from jsonschema import ValidationError
 
-from vedavaapi.accounts.agents_helpers import groups_helper
 from vedavaapi.common.helpers.api_helper import error_response, jsonify_argument, check_argument_type
 from vedavaapi.objectdb.helpers import ObjModelException, projection_helper
 
 from . import api
+from ... import myservice
 from ....oauth_server_helpers import clients_helper
 
 clients_ns = api.namespace('clients', path='/clients')
@@ -67,10 +67,7 @@ class Clients(flask_restplus.Resource):
     def post(self):
         if g.current_user_id is None:
             return error_response(message='not authorized', code=401)
-        current_user_group_ids = [
-            group['_id'] for group in groups_helper.get_user_groups(
-                g.users_colln, g.current_user_id, groups_projection={"_id": 1})
-        ]
+        current_user_group_ids = myservice().get_user_group_ids(g.current_org_name, g.current_user_id)
 
         args = self.post_parser.parse_args()
 
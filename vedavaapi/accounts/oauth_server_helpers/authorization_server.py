@@ -10,15 +10,21 @@ from .grants import AuthorizationCodeGrant, RefreshTokenGrant, PasswordGrant, Cl
 
 class AuthorizationServer(_AuthorizationServer):
 
-    def __init__(self, config, oauth_colln, users_colln, **kwargs):
+    def __init__(self, config, oauth_colln, users_colln, token_signer=None, client_cache=None, **kwargs):
+        """
+        :type token_signer: vedavaapi.accounts.oauth_server_helpers.token_signer.TokenSigner
+        """
         self.oauth_colln = oauth_colln
         self.users_colln = users_colln
         WrapperApp = namedtuple('WrapperApp', ('config', ))
         app = WrapperApp(config)
-        query_client = create_query_client_func(self.oauth_colln)
+        query_client = create_query_client_func(self.oauth_colln, client_cache=client_cache)
         save_token = create_save_token_func(self.oauth_colln)
 
         super(AuthorizationServer, self).__init__(app=app, query_client=query_client, save_token=save_token, **kwargs)
+        self.token_signer = token_signer
+        if self.token_signer is not None:
+            self.generate_token = self.token_signer.wrap_token_generator(self.generate_token)
         self.register_grants()
 
     def register_grants(self):
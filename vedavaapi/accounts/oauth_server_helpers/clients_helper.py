@@ -43,7 +43,8 @@ def get_client_underscore_id(oauth_colln, client_id):
 """
 
 
-def create_new_client(oauth_colln, client_json, client_type, user_id, group_ids, initial_agents=None):
+def create_new_client(
+        oauth_colln, client_json, client_type, user_id, group_ids, initial_agents=None):
     oauth2_master_config = oauth_colln.find_one({"jsonClass": OAuth2MasterConfig.json_class})
     if oauth2_master_config:
         grant_privileges_conf = oauth2_master_config['grant_privileges']
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+from .models import token_purge_at, authorization_code_purge_at
+
+
+class OAuthCollnCompactor(object):
+    """
+    expired tokens and codes are removed by ttl index on their "purge_at".
+    this periodically purges revoked tokens, and sets "purge_at" of tokens and codes stored before it existed,
+    in batches, so that each round trip stays short.
+    """
+
+    def __init__(self, oauth_colln, interval=3600, batch_size=1000, revoked_grace=0, label=''):
+        """
+        :param revoked_grace: revoked tokens are kept this long after their issue,
+            as signed tokens are checked against revocation list till their claims expire.
+        """
+        self.oauth_colln = oauth_colln
+        self.interval = interval
+        self.batch_size = batch_size
+        self.revoked_grace = revoked_grace
+        self.label = label
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def _ids_batch(self, selector_doc, projection=None):
+        return list(self.oauth_colln.find(selector_doc, projection=projection or {"_id": 1}).limit(self.batch_size))
+
+    def purge_revoked_tokens(self):
+        selector_doc = {
+            "jsonClass": "OAuth2Token",
+            "revoked": True,
+            "issued_at": {"$lt": time.time() - self.revoked_grace}
+        }
+        purged_count = 0
+        while True:
+            ids = [doc['_id'] for doc in self._ids_batch(selector_doc)]
+            if not ids:
+                return purged_count
+            deleted_count = self.oauth_colln.delete_many({"_id": {"$in": ids}}).deleted_count
+            if not deleted_count:
+                return purged_count
+            purged_count += deleted_count
+
+    def backfill_purge_at(self):
+        updated_count = 0
+        for json_class, purge_at_func, attrs in (
+                ('OAuth2Token', token_purge_at, ('issued_at', 'expires_in')),
+                ('OAuth2AuthorizationCode', authorization_code_purge_at, ('auth_time', ))):
+            selector_doc = {"jsonClass": json_class, "purge_at": {"$exists": False}}
+            projection = dict((attr, 1) for attr in ('_id', ) + attrs)
+            while True:
+                docs = self._ids_batch(selector_doc, projection=projection)
+                if not docs:
+                    break
+                for doc in docs:
+                    purge_at = purge_at_func(*[doc.get(attr, 0) for attr in attrs])
+                    self.oauth_colln.update_one({"_id": doc['_id']}, {"$set": {"purge_at": purge_at}})
+                updated_count += len(docs)
+        return updated_count
+
+    def collection_stats(self):
+        return {
+            "tokens": self.oauth_colln.count_documents({"jsonClass": "OAuth2Token"}),
+            "revoked_tokens": self.oauth_colln.count_documents({"jsonClass": "OAuth2Token", "revoked": True}),
+            "authorization_codes": self.oauth_colln.count_documents({"jsonClass": "OAuth2AuthorizationCode"}),
+            "total": self.oauth_colln.count_documents({})
+        }
+
+    def compact(self):
+        backfilled_count = self.backfill_purge_at()
+        purged_count = self.purge_revoked_tokens()
+        stats = self.collection_stats()
+        logging.info('oauth collection {}: purged {} revoked tokens, set purge_at of {} docs. sizes: {}'.format(
+            self.label, purged_count, backfilled_count, stats))
+        return stats
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.compact()
+            except Exception as e:
+                logging.warning('compaction of oauth collection {} failed: {}'.format(self.label, e))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='oauth-compactor-{}'.format(self.label), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
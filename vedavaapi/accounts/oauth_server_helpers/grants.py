@@ -1,21 +1,25 @@
 import sys
 import time
 
-from authlib.specs.rfc6749 import grants
+from authlib.specs.rfc6749 import grants, OAuth2Error
 from werkzeug.security import gen_salt
 
+from vedavaapi.objectdb.helpers import ObjModelException
 from vedavaapi.objectdb.mydb import MyDbCollection
 
 from .models import (
-    get_json_object,
+    authorization_code_purge_at,
     UserModel)
-from .models import (
-    OAuth2AuthorizationCodeModel,
-    OAuth2TokenModel
-)
+from .models import OAuth2AuthorizationCodeModel
+from .read_models import get_read_model, OAuth2AuthorizationCodeReadModel, OAuth2TokenReadModel
 from ..agents_helpers import users_helper
 
 
+class TemporarilyUnavailableError(OAuth2Error):
+    error = 'temporarily_unavailable'
+    status_code = 503
+
+
 # noinspection PyProtectedMember
 class AuthorizationCodeGrant(grants.AuthorizationCodeGrant):
 
@@ -31,8 +35,7 @@ class AuthorizationCodeGrant(grants.AuthorizationCodeGrant):
             "scope": request.scope,
             "user_id": grant_user._id,
         }
-        existing_item = get_json_object(
-            self.oauth_colln, authorization_code_doc, cast_class=OAuth2AuthorizationCodeModel)
+        existing_item = get_read_model(self.oauth_colln, authorization_code_doc, OAuth2AuthorizationCodeReadModel)
         if existing_item and not existing_item.is_expired():
             return existing_item.code
 
@@ -40,13 +43,15 @@ class AuthorizationCodeGrant(grants.AuthorizationCodeGrant):
         item.set_from_dict(authorization_code_doc)
         item.set_from_dict({"code": gen_salt(48), "auth_time": time.time()})
         item.validate()
-        self.oauth_colln.insert_one(item.to_json_map())
+        authorization_code_json = item.to_json_map()
+        authorization_code_json['purge_at'] = authorization_code_purge_at(item.auth_time)
+        self.oauth_colln.insert_one(authorization_code_json)
         return item.code
 
     def parse_authorization_code(self, code, client):
         query_doc = {"jsonClass": "OAuth2AuthorizationCode", "code": code, "client_id": client.client_id}
-        item = get_json_object(
-            self.oauth_colln, query_doc, cast_class=OAuth2AuthorizationCodeModel)  # type: OAuth2AuthorizationCodeModel
+        item = get_read_model(
+            self.oauth_colln, query_doc, OAuth2AuthorizationCodeReadModel)  # type: OAuth2AuthorizationCodeReadModel
 
         if item and not item.is_expired():
             return item
@@ -73,7 +78,11 @@ class PasswordGrant(grants.ResourceOwnerPasswordCredentialsGrant):
         user = users_helper.get_user(
             self.users_colln, user_selector_doc=users_helper.get_user_selector_doc(email=username))
         UserModel.cast(user)
-        if user.check_password(password):
+        try:
+            password_matches = user.check_password(password, users_colln=self.users_colln)
+        except ObjModelException as e:
+            raise TemporarilyUnavailableError(description=e.message, status_code=e.http_response_code)
+        if password_matches:
             return user
 
 
@@ -88,7 +97,7 @@ class RefreshTokenGrant(grants.RefreshTokenGrant):
 
     def authenticate_refresh_token(self, refresh_token):
         query_doc = {"jsonClass": "OAuth2Token", "refresh_token": refresh_token}
-        item = get_json_object(self.oauth_colln, query_doc, cast_class=OAuth2TokenModel)  # type: OAuth2TokenModel
+        item = get_read_model(self.oauth_colln, query_doc, OAuth2TokenReadModel)  # type: OAuth2TokenReadModel
 
         if item and not item.is_refresh_token_expired():
             return item
@@ -1,4 +1,4 @@
-import bcrypt
+import datetime
 import time
 
 from authlib.specs.rfc6749.models import ClientMixin, AuthorizationCodeMixin, TokenMixin
@@ -8,6 +8,11 @@ from sanskrit_ld.schema.oauth import OAuth2Client, OAuth2AuthorizationCode, OAut
 from sanskrit_ld.schema.users import User
 from vedavaapi.objectdb.mydb import MyDbCollection
 
+from ..agents_helpers import users_helper
+from .read_models import (
+    AUTHORIZATION_CODE_EXPIRES_IN, read_projection, get_read_model,
+    OAuth2ClientReadModel, OAuth2TokenReadModel)
+
 
 class OAuth2BaseModel(object):
 
@@ -26,12 +31,10 @@ class UserModel(OAuth2BaseModel, User):
     def get_user_id(self):
         return self._id
 
-    def check_password(self, password):
+    def check_password(self, password, users_colln=None):
         if not hasattr(self, 'hashedPassword'):
             return False
-        if not bcrypt.checkpw(password.encode('utf-8'), self.hashedPassword.encode('utf-8')):
-            return False
-        return True
+        return users_helper.check_password(self, password, users_colln=users_colln)
 
 
 class OAuth2ClientModel(OAuth2BaseModel, ClientMixin, OAuth2Client):
@@ -160,7 +163,7 @@ class OAuth2AuthorizationCodeModel(OAuth2BaseModel, AuthorizationCodeMixin, OAut
         return object.__getattribute__(self, item)
 
     def is_expired(self):
-        return self.auth_time + 300 < time.time()
+        return self.auth_time + AUTHORIZATION_CODE_EXPIRES_IN < time.time()
 
     def get_redirect_uri(self):
         return getattr(self, 'redirect_uri', None)
@@ -191,26 +194,57 @@ class OAuth2TokenModel(OAuth2BaseModel, TokenMixin, OAuth2Token):
         return expires_at < time.time()
 
 
+def purge_at_for(expires_at):
+    """
+    tokens and codes carry absolute "purge_at" date, after which ttl index on it removes them.
+    it is named so, as expires_at of clients means something else, and tokens expire before they can be purged.
+    """
+    return datetime.datetime.utcfromtimestamp(expires_at)
+
+
+def token_purge_at(issued_at, expires_in):
+    # tokens should outlive refresh window. see OAuth2TokenModel.is_refresh_token_expired
+    return purge_at_for(issued_at + expires_in * 2)
+
+
+def authorization_code_purge_at(auth_time):
+    return purge_at_for(auth_time + AUTHORIZATION_CODE_EXPIRES_IN)
+
+
 def get_json_object(colln, query_doc, projection=None, cast_class=None):
+    projection = read_projection(projection)
     item_json = colln.find_one(query_doc, projection=projection)
     item = JsonObject.make_from_dict(item_json)
     cast_class.cast(item)
     return item
 
 
-def create_query_client_func(oauth_colln):
+def create_query_client_func(oauth_colln, client_cache=None):
     """
 
     :type oauth_colln: MyDbCollection
+    :param client_cache: read through cache of clients by client_id.
+        clients are never updated or deleted in place as of now; any code that changes a client's secret,
+        redirect uris or grants, or deletes it, should pop it's client_id from this cache.
+    :type client_cache: vedavaapi.common.helpers.cache_helper.TTLCache
     :return:
     """
 
     def query_client(client_id):
+        if client_cache is not None:
+            client = client_cache.get(client_id)
+            if client is not None:
+                return client
+
         query_doc = {
             "jsonClass": "OAuth2Client",
             "client_id": client_id
         }
-        return get_json_object(oauth_colln, query_doc, cast_class=OAuth2ClientModel)
+        client = get_read_model(oauth_colln, query_doc, OAuth2ClientReadModel)
+        # unknown clients are not cached, as they may be created in other processes.
+        if client is not None and client_cache is not None:
+            client_cache.set(client_id, client)
+        return client
 
     return query_client
 
@@ -238,7 +272,9 @@ def create_save_token_func(oauth_colln):
         })
         item.set_from_dict(dict(**token))
         item.validate()
-        oauth_colln.insert_one(item.to_json_map())
+        token_json = item.to_json_map()
+        token_json['purge_at'] = token_purge_at(item.issued_at, item.expires_in)
+        oauth_colln.insert_one(token_json)
 
     return save_token
 
@@ -254,20 +290,20 @@ def create_query_token_func(oauth_colln):
         }
         if token_type_hint == 'access_token':
             query_doc.update({"access_token": token})
-            return get_json_object(oauth_colln, query_doc, cast_class=OAuth2TokenModel)
+            return get_read_model(oauth_colln, query_doc, OAuth2TokenReadModel)
         elif token_type_hint == 'refresh_token':
             query_doc.update({"refresh_token": token})
-            return get_json_object(oauth_colln, query_doc, cast_class=OAuth2TokenModel)
+            return get_read_model(oauth_colln, query_doc, OAuth2TokenReadModel)
 
         # without token_type_hint
         query_doc.update({"access_token": token})
-        item = get_json_object(oauth_colln, query_doc, cast_class=OAuth2TokenModel)
+        item = get_read_model(oauth_colln, query_doc, OAuth2TokenReadModel)
         if item is not None:
             return item
 
         query_doc.pop('access_token', None)
         query_doc.update({"refresh_token": token})
-        return get_json_object(oauth_colln, query_doc, cast_class=OAuth2TokenModel)
+        return get_read_model(oauth_colln, query_doc, OAuth2TokenReadModel)
 
     return query_token
 
@@ -292,13 +328,32 @@ def create_revocation_endpoint(oauth_colln):
                 "_id": token._id
             }
             update_toc = {
-                "revoked": True
+                "$set": {"revoked": True}
             }
             oauth_colln.update_one(selector_doc, update_toc)
 
     return _RevocationEndpoint
 
 
+def get_revoked_token_hashes(oauth_colln):
+    """
+    hashes of access tokens, which are revoked, but not yet expired.
+    resource services, which verify signed tokens locally, check them against this list.
+    """
+    from .token_signer import token_hash
+    query_doc = {
+        "jsonClass": "OAuth2Token",
+        "revoked": True
+    }
+    projection = {"access_token": 1, "issued_at": 1, "expires_in": 1}
+    now = time.time()
+    return [
+        token_hash(token_json['access_token'])
+        for token_json in oauth_colln.find(query_doc, projection=projection)
+        if token_json.get('issued_at', 0) + token_json.get('expires_in', 0) > now
+    ]
+
+
 def create_bearer_token_validator(oauth_colln):
     """
 
@@ -314,7 +369,7 @@ def create_bearer_token_validator(oauth_colln):
                 "jsonClass": "OAuth2Token",
                 "access_token": token_string
             }
-            return get_json_object(oauth_colln, query_doc, cast_class=OAuth2TokenModel)
+            return get_read_model(oauth_colln, query_doc, OAuth2TokenReadModel)
 
         def request_invalid(self, request):
             return False
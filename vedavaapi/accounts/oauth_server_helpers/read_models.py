@@ -0,0 +1,151 @@
+"""
+compact read only models of oauth objects, built directly from stored docs, without schema driven JsonObject construction.
+they implement methods of authlib's mixins, and are used on read paths only;
+models in models.py remain for writes and validation.
+"""
+
+import time
+
+
+AUTHORIZATION_CODE_EXPIRES_IN = 300
+
+
+def read_projection(projection=None):
+    if projection is None or 0 in projection.values():
+        # purge_at is storage detail, and not part of schema
+        projection = dict(projection or {}, purge_at=0)
+    return projection
+
+
+class ReadModel(object):
+    __slots__ = ('_doc', )
+
+    json_class = None
+
+    def __init__(self, doc):
+        object.__setattr__(self, '_doc', doc)
+
+    @classmethod
+    def from_doc(cls, doc):
+        if doc is None:
+            return None
+        return cls(doc)
+
+    def __getattr__(self, item):
+        # only called for attributes other than slots and methods; mirrors hasattr/getattr behaviour of JsonObject.
+        try:
+            return self._doc[item]
+        except KeyError:
+            raise AttributeError(item)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('{} is read only'.format(self.__class__.__name__))
+
+    def to_json_map(self):
+        return dict(self._doc)
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self._doc.get('_id', None))
+
+
+class OAuth2ClientReadModel(ReadModel):
+    __slots__ = ()
+
+    json_class = 'OAuth2Client'
+
+    @property
+    def client_metadata(self):
+        keys = [
+            'redirect_uris', 'token_endpoint_auth_method', 'grant_types',
+            'response_types', 'client_name', 'client_uri', 'logo_uri',
+            'scope', 'contacts', 'tos_uri', 'policy_uri', 'jwks_uri', 'jwks',
+        ]
+        return dict((k, self._doc[k]) for k in keys if k in self._doc)
+
+    @property
+    def client_info(self):
+        return dict(
+            client_id=self._doc.get('client_id', None),
+            client_secret=self._doc.get('client_secret', None),
+            client_id_issued_at=self._doc.get('issued_at', None),
+            client_secret_expires_at=self._doc.get('expires_at', None)
+        )
+
+    def get_client_id(self):
+        return self._doc.get('client_id', None)
+
+    def get_default_redirect_uri(self):
+        redirect_uris = self._doc.get('redirect_uris', None)
+        if redirect_uris:
+            return redirect_uris[0]
+
+    def check_redirect_uri(self, redirect_uri):
+        return redirect_uri in self._doc.get('redirect_uris', [])
+
+    def has_client_secret(self):
+        return 'client_secret' in self._doc
+
+    def check_client_secret(self, client_secret):
+        return 'client_secret' in self._doc and self._doc['client_secret'] == client_secret
+
+    def check_token_endpoint_auth_method(self, method):
+        return self._doc.get('token_endpoint_auth_method', None) == method
+
+    def check_response_type(self, response_type):
+        return response_type in self._doc.get('response_types', [])
+
+    def check_grant_type(self, grant_type):
+        return grant_type in self._doc.get('grant_types', [])
+
+    def check_requested_scopes(self, scopes):
+        if 'scope' not in self._doc:
+            return False
+        return set(self._doc['scope'].split()).issuperset(set(scopes))
+
+    def check_client_type(self, client_type):
+        if client_type == 'public':
+            return not self.has_client_secret()
+        if client_type == 'confidential':
+            return self.has_client_secret()
+        raise ValueError('Invalid client_type: {!r}'.format(client_type))
+
+
+class OAuth2AuthorizationCodeReadModel(ReadModel):
+    __slots__ = ()
+
+    json_class = 'OAuth2AuthorizationCode'
+
+    def is_expired(self):
+        return self._doc['auth_time'] + AUTHORIZATION_CODE_EXPIRES_IN < time.time()
+
+    def get_redirect_uri(self):
+        return self._doc.get('redirect_uri', None)
+
+    def get_scope(self):
+        return self._doc.get('scope', None)
+
+    def get_auth_time(self):
+        return self._doc.get('auth_time', None)
+
+
+class OAuth2TokenReadModel(ReadModel):
+    __slots__ = ()
+
+    json_class = 'OAuth2Token'
+
+    def get_scope(self):
+        return self._doc.get('scope', None)
+
+    def get_expires_in(self):
+        return self._doc.get('expires_in', None)
+
+    def get_expires_at(self):
+        return self._doc['issued_at'] + self._doc['expires_in']
+
+    def is_refresh_token_expired(self):
+        expires_at = self._doc['issued_at'] + self._doc['expires_in'] * 2
+        return expires_at < time.time()
+
+
+def get_read_model(colln, query_doc, read_model_class, projection=None):
+    return read_model_class.from_doc(colln.find_one(query_doc, projection=read_projection(projection)))
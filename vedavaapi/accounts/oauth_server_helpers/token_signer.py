@@ -0,0 +1,85 @@
+import hashlib
+import time
+import uuid
+
+from authlib.specs.rfc7519 import jwt, jwk
+
+
+def token_hash(access_token):
+    # revocation lists carry hashes of access tokens, instead of tokens themselves.
+    return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+
+class TokenSigner(object):
+    """
+    issues self-contained signed (JWT) access tokens, which resource services can verify locally,
+    with key set published by accounts service.
+    signed claims are valid only for claims_ttl, after which resource services fall back on token resolver.
+    """
+
+    def __init__(
+            self, private_key, public_key, group_ids_func, org_name,
+            alg='RS256', kid='default', issuer=None, claims_ttl=3600):
+        if alg.startswith('HS'):
+            raise ValueError('signed tokens need asymmetric keys, as key set is published')
+        self.private_key = private_key
+        self.public_key = public_key
+        self.group_ids_func = group_ids_func
+        self.org_name = org_name
+        self.alg = alg
+        self.kid = kid
+        self.issuer = issuer
+        self.claims_ttl = claims_ttl
+
+    @classmethod
+    def from_config(cls, signed_tokens_config, store, group_ids_func):
+        """
+        :param signed_tokens_config: "signed_tokens" section of accounts config. key paths are relative to org's creds store.
+        :type store: vedavaapi.common.helpers.store_helper.StoreHelper
+        """
+        with open(store.file_store_path('creds', signed_tokens_config['private_key']), 'rb') as private_key_file:
+            private_key = private_key_file.read()
+        with open(store.file_store_path('creds', signed_tokens_config['public_key']), 'rb') as public_key_file:
+            public_key = public_key_file.read()
+
+        return cls(
+            private_key, public_key, group_ids_func, store.org_name,
+            alg=signed_tokens_config.get('alg', 'RS256'), kid=signed_tokens_config.get('kid', 'default'),
+            issuer=signed_tokens_config.get('issuer', None),
+            claims_ttl=signed_tokens_config.get('claims_ttl', 3600))
+
+    def sign(self, client_id, user_id, scope, expires_in):
+        issued_at = int(time.time())
+        claims = {
+            "jti": uuid.uuid4().hex,
+            "org": self.org_name,
+            "client_id": client_id,
+            "user_id": user_id,
+            "scope": scope,
+            "group_ids": self.group_ids_func(user_id) if user_id else [],
+            "iat": issued_at,
+            "exp": issued_at + min(expires_in, self.claims_ttl),
+            "expires_in": expires_in
+        }
+        if self.issuer:
+            claims['iss'] = self.issuer
+        header = {"alg": self.alg, "kid": self.kid}
+        return jwt.encode(header, claims, self.private_key).decode('utf-8')
+
+    def wrap_token_generator(self, generate_token):
+        """
+        wraps authorization server's bearer token generator, such that it issues signed access tokens.
+        """
+        def generate_signed_token(client, grant_type, user=None, scope=None, **kwargs):
+            token = generate_token(client, grant_type, user=user, scope=scope, **kwargs)
+            # noinspection PyProtectedMember
+            user_id = user._id if user is not None else None
+            token['access_token'] = self.sign(client.client_id, user_id, scope, token['expires_in'])
+            return token
+
+        return generate_signed_token
+
+    def jwks(self):
+        kty = 'EC' if self.alg.startswith('ES') else 'RSA'
+        key = jwk.dumps(self.public_key, kty=kty, kid=self.kid, alg=self.alg, use='sig')
+        return {"keys": [key]}
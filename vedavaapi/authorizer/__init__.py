@@ -25,9 +25,12 @@ class VedavaapiAuthorizer(VedavaapiService):
         super(VedavaapiAuthorizer, self).__init__(registry, name, conf)
 
     def get_oauth_client_config(self, org_name, provider_name, client_name=None):
+        credentials_service = self.registry.lookup('credentials')
         oauth_client_config = {}
-        oauth_client_config['client_secret_file_path'] = self.registry.lookup('credentials').creds_path(
+        oauth_client_config['client_secret_file_path'] = credentials_service.creds_path(
             org_name, 'oauth', provider_name, client_name=client_name)
+        oauth_client_config['client_secret_json'] = credentials_service.load_creds(
+            oauth_client_config['client_secret_file_path'])
         return oauth_client_config
 
     def get_accounts_api_config(self, org_name):
@@ -23,6 +23,13 @@ class OauthClientsRegistry(object):
         return cls.client_classes.get(provider_name, None)
 
 
+def client_secret_json_from(config):
+    # parsed client secret is provided by credentials service; file path remains as fallback.
+    if config.get('client_secret_json', None) is not None:
+        return config['client_secret_json']
+    return json.load(open(config['client_secret_file_path']))
+
+
 class OAuthClient(object):
 
     provider_name = 'provider'
@@ -65,8 +72,7 @@ class GoogleClient(OAuthClient):
 
     def __init__(self, config):
         super(GoogleClient, self).__init__(config)
-        client_secret_file_path = config['client_secret_file_path']
-        client_secret_json = json.load(open(client_secret_file_path))
+        client_secret_json = client_secret_json_from(config)
 
         self.client_details = {}
         for key in client_secret_json:
@@ -138,8 +144,7 @@ class FacebookClient(OAuthClient):
 
     def __init__(self, config):
         super(FacebookClient, self).__init__(config)
-        client_secret_file_path = config['client_secret_file_path']
-        client_secret_json = json.load(open(client_secret_file_path))
+        client_secret_json = client_secret_json_from(config)
 
         self.client_details = {}
         for key in client_secret_json:
@@ -222,8 +227,7 @@ class VedavaapiClient(OAuthClient):
     def __init__(self, config):
         super(VedavaapiClient, self).__init__(config)
         self.org_name = config['org_name']
-        client_secret_file_path = config['client_secret_file_path']
-        client_secret_json = json.load(open(client_secret_file_path))
+        client_secret_json = client_secret_json_from(config)
 
         print(self.userinfo_api_endpoint)
         self.userinfo_api_endpoint = self.userinfo_api_endpoint.format(org_name=self.org_name)
@@ -4,6 +4,9 @@ import json
 import logging
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from vedavaapi.common.helpers.store_helper import StoreHelper
 
@@ -54,6 +57,12 @@ class OrgHandler(object):
     def initialize(self):
         pass
 
+    def teardown(self):
+        """
+        releases what initialize started, like background threads; called before handler is replaced.
+        """
+        pass
+
     def reset(self):
         for key, val in self.dbs_config.items():
             db_name = val.get('name', None)
@@ -82,19 +91,39 @@ class VedavaapiService(object):
         self.name = name
         self.config = conf if conf is not None else {}
         self.org_handlers = {}
+        self._org_locks = {}
+        self._org_locks_lock = threading.Lock()
         self._update_instance_ref(self)
 
+    def _org_lock(self, org_name):
+        with self._org_locks_lock:
+            if org_name not in self._org_locks:
+                self._org_locks[org_name] = threading.Lock()
+            return self._org_locks[org_name]
+
     # following are methods dealing with repo, like init, get, reset repo for this service
+    def _new_org_handler(self, org_name):
+        org = self.org_handler_class(self, org_name)  # type: OrgHandler
+        org.initialize()
+        return org
+
+    def _discard_org_handler(self, org_name):
+        # to be called with org's lock held.
+        org = self.org_handlers.pop(org_name, None)  # type: OrgHandler
+        if org is not None:
+            org.teardown()
+
     def init_org(self, org_name):
         """
-        initializes repo with given repo_name for this service
+        initializes repo with given repo_name for this service.
+        handler is published only after it's initialization, so that no other thread gets it half initialized.
+        any previous handler is torn down first.
         :param org_name:
         :return:
         """
-        if org_name not in self.org_handlers:
-            org = self.org_handler_class(self, org_name)  # type: OrgHandler
-            self.org_handlers[org_name] = org
-        self.org_handlers[org_name].initialize()
+        with self._org_lock(org_name):
+            self._discard_org_handler(org_name)
+            self.org_handlers[org_name] = self._new_org_handler(org_name)
 
     def get_org(self, org_name):
         """
@@ -102,10 +131,27 @@ class VedavaapiService(object):
         :param org_name:
         :return: repo object corresponding to repo_name, and service
         """
-        if org_name not in self.org_handlers:
-            self.init_org(org_name)
-        org_handler = self.org_handlers[org_name]  # type: OrgHandler
-        return org_handler
+        org_handler = self.org_handlers.get(org_name, None)  # type: OrgHandler
+        if org_handler is not None:
+            return org_handler
+        with self._org_lock(org_name):
+            # may have been initialized by another thread meanwhile.
+            if org_name not in self.org_handlers:
+                self.org_handlers[org_name] = self._new_org_handler(org_name)
+            return self.org_handlers[org_name]
+
+    def eager_init_org(self, org_name):
+        """
+        initializes org, if not yet initialized. if initialization fails, nothing is published,
+        and it will be retried lazily on next get_org.
+        :return: seconds taken, or None if org was already initialized.
+        """
+        with self._org_lock(org_name):
+            if org_name in self.org_handlers:
+                return None
+            start_time = time.time()
+            self.org_handlers[org_name] = self._new_org_handler(org_name)
+            return time.time() - start_time
 
     def reset_org(self, org_name):
         """
@@ -113,10 +159,11 @@ class VedavaapiService(object):
         :param org_name:
         :return:
         """
-        if org_name not in self.org_handlers:
-            org = self.org_handler_class(self, org_name)
-            self.org_handlers[org_name] = org
-        self.org_handlers[org_name].reset()
+        with self._org_lock(org_name):
+            # existing handler is stale after reset; org is initialized afresh on next init_org or get_org.
+            self._discard_org_handler(org_name)
+            # a handler only for reset is not published, as it is not initialized.
+            self.org_handler_class(self, org_name).reset()
 
     # methods dealing with api plugging.
     @classmethod
@@ -184,6 +231,7 @@ class VedavaapiServices:
     all_services = {}
     install_path = None
     service_configs = None
+    org_init_timings = {}
 
     @classmethod
     def initialize(cls, install_path):
@@ -211,6 +259,11 @@ class VedavaapiServices:
             cls.orgs_config = json.loads(fhandle.read().decode('utf-8'))
             cls.org_names = list(cls.orgs_config.keys())
 
+    @classmethod
+    def db_clients_stats(cls):
+        from .helpers import db_clients_helper
+        return db_clients_helper.db_clients_stats()
+
     @classmethod
     def register(cls, svcname, service):
         cls.all_services[svcname] = service
@@ -220,6 +273,85 @@ class VedavaapiServices:
         # print("In lookup({}): {}".format(svcname, cls.all_services))
         return cls.all_services[svcname] if svcname in cls.all_services else None  # type: VedavaapiService
 
+    @classmethod
+    def dependency_levels(cls, svcnames):
+        """
+        groups started services into levels, such that each service's dependencies are in earlier levels.
+        """
+        levels_map = {}
+
+        def level(svcname):
+            if svcname not in levels_map:
+                svc = cls.all_services[svcname]
+                levels_map[svcname] = 1 + max(
+                    [level(dep) for dep in svc.dependency_services if dep in cls.all_services] or [-1])
+            return levels_map[svcname]
+
+        for svcname in svcnames:
+            level(svcname)
+        levels = [[] for i in range(max(levels_map.values()) + 1)] if levels_map else []
+        for svcname, svc_level in levels_map.items():
+            levels[svc_level].append(svcname)
+        return levels
+
+    @classmethod
+    def init_all_orgs(cls, max_workers=8):
+        """
+        eagerly initializes every org of every started service, in a thread pool.
+        orgs of a service are initialized only after those of it's dependency services.
+        :return: {service_name: {org_name: seconds taken}}; failed inits are logged and left to lazy initialization.
+        """
+        timings = {}
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='org-init') as executor:
+            for level in cls.dependency_levels(list(cls.all_services.keys())):
+                futures = dict(
+                    ((svcname, org_name), executor.submit(cls.all_services[svcname].eager_init_org, org_name))
+                    for svcname in level for org_name in cls.org_names
+                )
+                for (svcname, org_name), future in futures.items():
+                    try:
+                        duration = future.result()
+                    except Exception as e:
+                        logging.error('initialization of org {} of service {} failed: {}'.format(org_name, svcname, e))
+                        continue
+                    if duration is None:
+                        continue
+                    timings.setdefault(svcname, {})[org_name] = duration
+                    logging.info('initialized org {} of service {} in {:.3f}s'.format(org_name, svcname, duration))
+
+        logging.info('initialized orgs of all services in {:.3f}s'.format(time.time() - start_time))
+        cls.org_init_timings = timings
+        return timings
+
+    # keys of "accounts_api" section, which configure process wide token resolution.
+    token_resolution_config_keys = ('resolver_mode', 'token_cache', 'http', 'signed_tokens')
+
+    @classmethod
+    def configure_token_resolution(cls):
+        """
+        token resolution is process wide, hence configured once, from "accounts_api" sections of started services.
+        they should all have same token resolution settings; if they differ,
+        those of first started service are applied, and others are ignored with a warning.
+        """
+        from .helpers import token_helper
+        services_settings = [
+            (svcname, dict(
+                (key, value) for (key, value) in svc.config['accounts_api'].items()
+                if key in cls.token_resolution_config_keys))
+            for (svcname, svc) in cls.all_services.items() if 'accounts_api' in svc.config
+        ]
+        if not services_settings:
+            return
+
+        svcname, settings = services_settings[0]
+        differing_svcnames = [name for (name, other_settings) in services_settings[1:] if other_settings != settings]
+        if differing_svcnames:
+            logging.warning(
+                'token resolution settings in accounts_api of services {} differ from those of {}, '
+                'which are applied to whole process'.format(differing_svcnames, svcname))
+        token_helper.configure(settings)
+
     @classmethod
     def service_class_name(cls, service_name):
         return "Vedavaapi" + ''.join(x.capitalize() or '_' for x in service_name.split('_'))
@@ -256,7 +388,10 @@ class VedavaapiServices:
         svc.register_api(app, "/{}".format(svcname))
 
 
-def start_app(app, install_path, services, reset=False):
+def start_app(app, install_path, services, reset=False, eager_init=False, init_workers=8):
+    """
+    :param eager_init: initialize all orgs of all services before serving, instead of on first request to each.
+    """
     if not services:
         return
 
@@ -266,3 +401,7 @@ def start_app(app, install_path, services, reset=False):
         if svc in VedavaapiServices.all_services:
             continue
         VedavaapiServices.start(app, svc, reset)
+    VedavaapiServices.configure_token_resolution()
+
+    if eager_init:
+        VedavaapiServices.init_all_orgs(max_workers=init_workers)
@@ -0,0 +1,147 @@
+"""
+process wide registry of db clients, keyed by (db_type, db_host).
+every OrgHandler of every service on same host shares one client, and hence one connection pool and monitor threads.
+"""
+
+import logging
+import os
+import threading
+
+from urllib import parse
+
+
+_clients = {}  # (db_type, db_host) -> (pid, pool_options, client)
+_clients_lock = threading.Lock()
+
+_pool_stats = {}  # pool address -> stats
+_pool_stats_lock = threading.Lock()
+_pool_listener_registered = False
+
+
+def _with_uri_options(db_host, options):
+    """
+    pool options are passed as connection string options, which every mongo driver honours.
+    options already in uri take precedence (option names are case insensitive).
+    a bare "host:port" db_host is turned into a "mongodb://" uri, as options can only be given in one.
+    """
+    if not options:
+        return db_host
+    uri = db_host if '://' in db_host else 'mongodb://{}'.format(db_host)
+    split_uri = parse.urlsplit(uri)
+    existing_keys = set(key.lower() for key, value in parse.parse_qsl(split_uri.query, keep_blank_values=True))
+    new_options = [
+        (key, str(value).lower() if isinstance(value, bool) else str(value))
+        for key, value in options.items() if key.lower() not in existing_keys
+    ]
+    if not new_options:
+        return db_host
+    # existing query is kept verbatim, as re encoding it may alter values.
+    query = '&'.join([q for q in (split_uri.query, parse.urlencode(new_options)) if q])
+    # options must follow a "/", even when there is no database in uri.
+    return parse.urlunsplit(split_uri._replace(path=split_uri.path or '/', query=query))
+
+
+def _record(address, **increments):
+    with _pool_stats_lock:
+        stats = _pool_stats.setdefault(str(address), {
+            "connections_created": 0, "connections_closed": 0, "checked_out": 0,
+            "checkouts": 0, "checkout_failures": 0, "pools_cleared": 0
+        })
+        for key, increment in increments.items():
+            stats[key] += increment
+
+
+def _register_pool_listener():
+    global _pool_listener_registered
+    if _pool_listener_registered:
+        return
+    try:
+        from pymongo import monitoring
+        listener_base = monitoring.ConnectionPoolListener
+    except (ImportError, AttributeError):
+        # older drivers doesn't publish pool events.
+        logging.info('db connection pool events are not available with installed driver')
+        _pool_listener_registered = True
+        return
+
+    class PoolStatsListener(listener_base):
+
+        def pool_created(self, event):
+            _record(event.address)
+
+        def pool_cleared(self, event):
+            _record(event.address, pools_cleared=1)
+
+        def pool_closed(self, event):
+            pass
+
+        def connection_created(self, event):
+            _record(event.address, connections_created=1)
+
+        def connection_ready(self, event):
+            pass
+
+        def connection_closed(self, event):
+            _record(event.address, connections_closed=1)
+
+        def connection_check_out_started(self, event):
+            pass
+
+        def connection_check_out_failed(self, event):
+            _record(event.address, checkout_failures=1)
+
+        def connection_checked_out(self, event):
+            _record(event.address, checkouts=1, checked_out=1)
+
+        def connection_checked_in(self, event):
+            _record(event.address, checked_out=-1)
+
+    # applies to clients created hereafter.
+    monitoring.register(PoolStatsListener())
+    _pool_listener_registered = True
+
+
+def _new_db_client(db_type, db_host, pool_options):
+    if db_type == 'mongo':
+        _register_pool_listener()
+        from vedavaapi.objectdb import mongo, mydb
+        mongo_client = mongo.MongoDbClient(host_uri=_with_uri_options(db_host, pool_options))
+        return mydb.MyDbClient(mongo_client)
+    return None
+
+
+def get_db_client(db_type, db_host, pool_options=None):
+    """
+    :param pool_options: connection pool options, like maxPoolSize, minPoolSize, maxIdleTimeMS, waitQueueTimeoutMS.
+        they are fixed by first request for a host; differing options of later requests are ignored with a warning.
+    """
+    pool_options = pool_options or {}
+    key = (db_type, db_host)
+    pid = os.getpid()
+    with _clients_lock:
+        entry = _clients.get(key, None)
+        # clients are not fork safe; a forked worker creates it's own.
+        if entry is None or entry[0] != pid:
+            client = _new_db_client(db_type, db_host, pool_options)
+            if client is None:
+                return None
+            _clients[key] = (pid, pool_options, client)
+            # host is not logged, as it may carry credentials.
+            logging.info('created {} client with pool options {}'.format(db_type, pool_options))
+            return client
+
+        if entry[1] != pool_options:
+            logging.warning('{} client for same host already exists with pool options {}, ignoring {}'.format(
+                db_type, entry[1], pool_options))
+        return entry[2]
+
+
+def db_clients_stats():
+    with _clients_lock:
+        clients = [
+            {"db_type": db_type, "pool_options": pool_options}
+            for (db_type, db_host), (pid, pool_options, client) in _clients.items()
+        ]
+    with _pool_stats_lock:
+        pools = dict((address, stats.copy()) for (address, stats) in _pool_stats.items())
+    return {"clients": clients, "pools": pools}
@@ -0,0 +1,47 @@
+import logging
+from collections import OrderedDict
+
+
+def index_spec(name, *keys, **options):
+    """
+    :param keys: (field, direction) pairs, in order.
+    :param options: index options, like expireAfterSeconds.
+    """
+    spec = {"name": name, "keys": OrderedDict(keys)}
+    if options:
+        spec['options'] = options
+    return spec
+
+
+def ensure_indexes(colln, index_specs):
+    """
+    creates indexes declared in index_specs. idempotent, as indexes are created by name.
+    """
+    for spec in index_specs:
+        colln.create_index(keys_dict=spec['keys'], index_name=spec['name'], **spec.get('options', {}))
+
+
+def check_indexes(colln, index_specs, colln_label=''):
+    """
+    logs indexes declared in index_specs, which are missing in collection,
+    and indexes in collection, which were not used since db server started.
+    :return: (missing index names, unused index names)
+    """
+    try:
+        existing_index_names = set(colln.index_information().keys())
+        index_stats = list(colln.aggregate([{"$indexStats": {}}]))
+    except Exception as e:
+        logging.warning('cannot check indexes of {}: {}'.format(colln_label, e))
+        return None, None
+
+    missing_index_names = [spec['name'] for spec in index_specs if spec['name'] not in existing_index_names]
+    unused_index_names = [
+        stats['name'] for stats in index_stats
+        if stats['name'] != '_id_' and not stats.get('accesses', {}).get('ops', 0)
+    ]
+
+    if missing_index_names:
+        logging.warning('missing indexes on {}: {}'.format(colln_label, missing_index_names))
+    if unused_index_names:
+        logging.info('indexes on {} not used since db server start: {}'.format(colln_label, unused_index_names))
+    return missing_index_names, unused_index_names
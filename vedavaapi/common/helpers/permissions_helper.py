@@ -0,0 +1,250 @@
+import copy
+from collections import OrderedDict
+
+import six
+from sanskrit_ld.helpers.permissions_helper import PermissionResolver
+from sanskrit_ld.schema.base import ObjectPermissions
+from vedavaapi.objectdb.helpers import projection_helper
+
+
+_permissions_projection = {"_id": 1, "jsonClass": 1, "source": 1, "permissions": 1}
+
+
+def _source_ids(resource_json):
+    source = resource_json.get('source', None)
+    if not source:
+        return []
+    if isinstance(source, six.string_types):
+        return [source]
+    if isinstance(source, list):
+        return [s for s in source if isinstance(s, six.string_types)]
+    return []
+
+
+class PrefetchedResourcesColln(object):
+    """
+    stand in for a collection, handed to PermissionResolver while resolving permissions of a batch of resources.
+    serves lookups of resources by _id from prefetched (and memoized) docs,
+    and delegates everything else to underlying collection.
+    """
+
+    def __init__(self, colln, resource_jsons_map):
+        self.colln = colln
+        self.resource_jsons_map = resource_jsons_map
+
+    def _lookup(self, _id, fetch):
+        if _id not in self.resource_jsons_map:
+            self.resource_jsons_map[_id] = fetch()
+        resource_json = self.resource_jsons_map[_id]
+        return copy.deepcopy(resource_json) if resource_json is not None else None
+
+    def get(self, _id, projection=None, **kwargs):
+        if not isinstance(_id, six.string_types):
+            return self.colln.get(_id, projection=projection, **kwargs)
+        return self._lookup(_id, lambda: self.colln.get(_id, projection=_permissions_projection))
+
+    def find_one(self, query, projection=None, **kwargs):
+        _id = query.get('_id', None)
+        if not isinstance(_id, six.string_types) or not set(query.keys()) <= {'_id', 'jsonClass'}:
+            return self.colln.find_one(query, projection=projection, **kwargs)
+
+        resource_json = self._lookup(_id, lambda: self.colln.get(_id, projection=_permissions_projection))
+        if resource_json is not None and 'jsonClass' in query and resource_json.get('jsonClass') != query['jsonClass']:
+            return None
+        return resource_json
+
+    def __getattr__(self, item):
+        return getattr(self.colln, item)
+
+
+def prefetch_ancestors(colln, resource_jsons, resource_jsons_map=None):
+    """
+    fetches all source ancestors of given resources, level by level, with one $in query per level.
+    :return: map of _id -> permission relevant parts of each ancestor, including given resources.
+    """
+    resource_jsons_map = resource_jsons_map if resource_jsons_map is not None else {}
+    for resource_json in resource_jsons:
+        if '_id' in resource_json:
+            resource_jsons_map.setdefault(resource_json['_id'], resource_json)
+
+    level_jsons = resource_jsons
+    while True:
+        frontier_ids = set()
+        for resource_json in level_jsons:
+            frontier_ids.update(_source_ids(resource_json))
+        frontier_ids = [_id for _id in frontier_ids if _id not in resource_jsons_map]
+        if not frontier_ids:
+            break
+
+        level_jsons = list(colln.find({"_id": {"$in": frontier_ids}}, projection=_permissions_projection))
+        for resource_json in level_jsons:
+            resource_jsons_map[resource_json['_id']] = resource_json
+        for _id in frontier_ids:
+            # memoize missing ancestors too.
+            resource_jsons_map.setdefault(_id, None)
+
+    return resource_jsons_map
+
+
+def resolve_permissions(
+        colln, resource_jsons, action, user_id, group_ids, true_if_none=False, resource_jsons_map=None):
+    """
+    batch equivalent of PermissionResolver.resolve_permission.
+    given resource jsons should include their "permissions" and "source" attributes.
+    :param resource_jsons_map: prefetched ancestors, to be shared across batches.
+    :return: list of booleans, in order of given resources.
+    """
+    resource_jsons = list(resource_jsons)
+    prefetched_colln = PrefetchedResourcesColln(
+        colln, prefetch_ancestors(colln, resource_jsons, resource_jsons_map=resource_jsons_map))
+    return [
+        PermissionResolver.resolve_permission(
+            resource_json, action, user_id, group_ids, prefetched_colln, true_if_none=true_if_none)
+        for resource_json in resource_jsons
+    ]
+
+
+def filter_permitted(colln, resource_jsons, action, user_id, group_ids, resource_jsons_map=None):
+    resource_jsons = list(resource_jsons)
+    permissions = resolve_permissions(
+        colln, resource_jsons, action, user_id, group_ids, resource_jsons_map=resource_jsons_map)
+    return [resource_json for (resource_json, permitted) in zip(resource_jsons, permissions) if permitted]
+
+
+'''
+pushing permission checks down into queries
+'''
+
+
+def _agent_set_clauses(action, status, user_id, group_ids):
+    clauses = []
+    if user_id:
+        clauses.append({"permissions.{}.{}.users".format(action, status): user_id})
+    if group_ids:
+        clauses.append({"permissions.{}.{}.groups".format(action, status): {"$in": list(group_ids)}})
+    return clauses
+
+
+def _in_agent_set(resource_json, action, status, user_id, group_ids):
+    agent_set = resource_json.get('permissions', {}).get(action, {}).get(status, {})
+    if user_id and user_id in agent_set.get('users', []):
+        return True
+    return bool(set(group_ids or []).intersection(agent_set.get('groups', [])))
+
+
+def is_explicitly_permitted(resource_json, action, user_id, group_ids):
+    return (
+        _in_agent_set(resource_json, action, 'granted', user_id, group_ids)
+        and not _in_agent_set(resource_json, action, 'withdrawn', user_id, group_ids))
+
+
+def permission_selectors(action, user_id, group_ids):
+    """
+    translates an agent's permission over an action into mongo selectors over "permissions" agent sets.
+    resources granting action to agent, and not withdrawing it, are permitted explicitly.
+    resources withdrawing it, and not granting, are denied explicitly.
+    rest (neither, or both) are to be resolved by PermissionResolver, as they may inherit permissions from source.
+    :return: (selector of resources, which are not denied explicitly; selector of explicitly permitted resources)
+        either may be None, if it matches everything, or nothing respectively.
+    """
+    granted_clauses = _agent_set_clauses(action, 'granted', user_id, group_ids)
+    withdrawn_clauses = _agent_set_clauses(action, 'withdrawn', user_id, group_ids)
+
+    if not withdrawn_clauses:
+        return None, ({"$or": granted_clauses} if granted_clauses else None)
+
+    not_withdrawn_selector = {"$nor": withdrawn_clauses}
+    if not granted_clauses:
+        return not_withdrawn_selector, None
+
+    candidates_selector = {"$or": granted_clauses + [not_withdrawn_selector]}
+    explicitly_permitted_selector = {"$and": [{"$or": granted_clauses}, not_withdrawn_selector]}
+    return candidates_selector, explicitly_permitted_selector
+
+
+def _and(*selector_docs):
+    selector_docs = [sd for sd in selector_docs if sd]
+    if not selector_docs:
+        return {}
+    if len(selector_docs) == 1:
+        return selector_docs[0]
+    return {"$and": selector_docs}
+
+
+def _stream_permitted(colln, resources_cursor, action, user_id, group_ids, skip, limit, batch_size):
+    """
+    post filters resources, which need resolution of inherited permissions, in batches,
+    applying skip and limit on permitted resources, and stopping as soon as limit is reached.
+    """
+    permitted_resource_jsons = []
+    resource_jsons_map = {}
+    to_skip = skip
+
+    def consume(batch):
+        nonlocal to_skip
+        unresolved = [rj for rj in batch if not is_explicitly_permitted(rj, action, user_id, group_ids)]
+        permissions = dict(zip(
+            [id(rj) for rj in unresolved],
+            resolve_permissions(
+                colln, unresolved, action, user_id, group_ids, resource_jsons_map=resource_jsons_map)))
+        for resource_json in batch:
+            if not permissions.get(id(resource_json), True):
+                continue
+            if to_skip:
+                to_skip -= 1
+                continue
+            permitted_resource_jsons.append(resource_json)
+            if limit and len(permitted_resource_jsons) >= limit:
+                return False
+        return True
+
+    batch = []
+    for resource_json in resources_cursor:
+        batch.append(resource_json)
+        if len(batch) < batch_size:
+            continue
+        if not consume(batch):
+            return permitted_resource_jsons
+        batch = []
+    if batch:
+        consume(batch)
+    return permitted_resource_jsons
+
+
+def get_read_permitted_resource_jsons(
+        colln, user_id, group_ids, selector_doc, projection=None, ops=None, batch_size=100):
+    """
+    explicitly denied resources are excluded by query itself, and explicitly permitted ones are taken as is.
+    only resources, which may inherit permissions, are post filtered.
+    if there are no such resources, skip and limit are applied by db too.
+    """
+    action = ObjectPermissions.READ
+    ops = OrderedDict(ops or {})
+    skip = ops.pop('skip', [0])[0] or 0
+    limit = ops.pop('limit', [0])[0] or 0
+
+    candidates_selector, explicitly_permitted_selector = permission_selectors(action, user_id, group_ids)
+    query = _and(selector_doc, candidates_selector)
+    needs_resolution_query = _and(
+        query, {"$nor": [explicitly_permitted_selector]} if explicitly_permitted_selector else None)
+    needs_post_filter = colln.find_one(needs_resolution_query, projection={"_id": 1}) is not None
+
+    fetch_projection = projection_helper.modified_projection(
+        projection, mandatory_attrs=list(_permissions_projection.keys()))
+    resources_cursor = colln.find(query, projection=fetch_projection)
+    for op, args in ops.items():
+        resources_cursor = getattr(resources_cursor, op)(*args)
+
+    if needs_post_filter:
+        permitted_resource_jsons = _stream_permitted(
+            colln, resources_cursor, action, user_id, group_ids, skip, limit, batch_size)
+    else:
+        if skip:
+            resources_cursor = resources_cursor.skip(skip)
+        if limit:
+            resources_cursor = resources_cursor.limit(limit)
+        permitted_resource_jsons = list(resources_cursor)
+
+    return [
+        projection_helper.project_doc(resource_json, projection) for resource_json in permitted_resource_jsons
+    ]
@@ -0,0 +1,70 @@
+"""
+holders of objects, which should not be shared across processes, like keep-alive http sessions and worker pools.
+a forked worker process creates it's own, instead of reusing it's parent's connections or workers.
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ProcessLocal(object):
+    """
+    one lazily created object per process.
+    """
+
+    def __init__(self, factory, on_discard=None):
+        """
+        :param factory: callable creating the object.
+        :param on_discard: callable to release a discarded object, like closing it.
+            it is not called for objects inherited from parent process, as their resources belong to parent.
+        """
+        self.factory = factory
+        self.on_discard = on_discard
+        self._entry = None  # (pid, object)
+        self._lock = threading.Lock()
+
+    def get(self):
+        pid = os.getpid()
+        entry = self._entry
+        if entry is not None and entry[0] == pid:
+            return entry[1]
+        with self._lock:
+            if self._entry is None or self._entry[0] != pid:
+                self._entry = (pid, self.factory())
+            return self._entry[1]
+
+    def discard(self, obj=None):
+        """
+        discards object of this process, so that next get creates afresh; like after a change in it's config.
+        :param obj: if given, discards only if it is still the current object; like when it is found broken.
+        """
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != os.getpid() or (obj is not None and entry[1] is not obj):
+                return
+            self._entry = None
+        if self.on_discard is not None:
+            self.on_discard(entry[1])
+
+
+def new_session(pool_maxsize=10, max_retries=0):
+    """
+    keep-alive http session, with pool of upto pool_maxsize connections per host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=max_retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def process_local_session(pool_maxsize_func, max_retries=0):
+    """
+    :param pool_maxsize_func: callable returning pool size, read afresh whenever session is (re)created.
+    """
+    return ProcessLocal(
+        lambda: new_session(pool_maxsize=pool_maxsize_func(), max_retries=max_retries),
+        on_discard=lambda session: session.close())
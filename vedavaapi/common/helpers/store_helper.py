@@ -1,19 +1,29 @@
 import glob
 import logging
 import os
+import threading
+
+from . import db_clients_helper
 
 
 class StoreHelper(object):
 
     allowed_file_store_types = ['data', 'conf', 'creds', 'tmp', 'log', 'cache', 'www']
 
+    # directories known to exist, shared by all store helpers of process; so that steady state lookups don't stat.
+    _known_dirs = set()
+    _known_dirs_lock = threading.Lock()
+    max_resolved_paths = 10000
+
     def __init__(self, org_name, service_name, registry):
         self.registry = registry
         self.org_name = org_name
         self.org_config = self.registry.orgs_config[self.org_name]
         self.service_name = service_name
+        self._resolved_paths = {}  # (file_store_type, base_path) -> abs path
 
-        self.mydb_client = self.get_db_client(self.org_config['db_type'], self.org_config['db_host'])
+        self.mydb_client = self.get_db_client(
+            self.org_config['db_type'], self.org_config['db_host'], pool_options=self.org_config.get('db_pool', None))
 
     # methods dealing with filestore
     def _abs_path(self, file_store_type, base_path):
@@ -30,18 +40,47 @@ class StoreHelper(object):
         ))
         return requested_path
 
+    def _resolved_path(self, file_store_type, base_path):
+        key = (file_store_type, base_path)
+        requested_path = self._resolved_paths.get(key, None)
+        if requested_path is None:
+            requested_path = self._abs_path(file_store_type, base_path)
+            if len(self._resolved_paths) >= self.max_resolved_paths:
+                self._resolved_paths.clear()
+            self._resolved_paths[key] = requested_path
+        return requested_path
+
+    @classmethod
+    def _ensure_dir(cls, dir_path):
+        if dir_path in cls._known_dirs:
+            return
+        os.makedirs(dir_path, exist_ok=True)
+        with cls._known_dirs_lock:
+            cls._known_dirs.add(dir_path)
+
+    @classmethod
+    def forget_dirs(cls, path):
+        """
+        invalidates memoized existence of path, and of directories under it.
+        to be called whenever directories are removed outside of delete_path.
+        """
+        path = os.path.normpath(path)
+        with cls._known_dirs_lock:
+            cls._known_dirs = set(
+                d for d in cls._known_dirs if d != path and not d.startswith(path.rstrip(os.sep) + os.sep))
+
     def file_store_path(self, file_store_type, base_path, is_dir=False):
         # our conventional way to get file_path. it creates all directories wanted for leaf.
-        requested_path = self._abs_path(file_store_type, base_path)
+        requested_path = self._resolved_path(file_store_type, base_path)
         # print('requested_path', requested_path)
-        if not os.path.exists(os.path.dirname(requested_path)):
-            os.makedirs(os.path.dirname(requested_path))
-        if is_dir and not os.path.exists(requested_path):
-            os.makedirs(requested_path)
+        self._ensure_dir(os.path.dirname(requested_path))
+        if is_dir:
+            self._ensure_dir(requested_path)
         return requested_path
 
-    @staticmethod
-    def delete_path(file_path):
+    @classmethod
+    def delete_path(cls, file_path):
+        cls.forget_dirs(file_path)
         try:
             os.system("rm -rf {path}".format(path=file_path))
         except Exception as e:
@@ -58,12 +97,9 @@ class StoreHelper(object):
 
     # methods dealing with dbs
     @classmethod
-    def get_db_client(cls, db_type, db_host):
-        if db_type == 'mongo':
-            from vedavaapi.objectdb import mongo, mydb
-            mongo_client = mongo.MongoDbClient(host_uri=db_host)
-            my_db_client = mydb.MyDbClient(mongo_client)
-            return my_db_client
+    def get_db_client(cls, db_type, db_host, pool_options=None):
+        # shared by all orgs and services on same host
+        return db_clients_helper.get_db_client(db_type, db_host, pool_options=pool_options)
 
     def db_name(self, db_name_suffix):
         return '_'.join([self.org_config.get('db_prefix'), db_name_suffix])
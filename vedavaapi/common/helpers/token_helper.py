@@ -1,13 +1,18 @@
 import functools
+import hashlib
 import sys
+import time
 
-import requests
+from authlib.common.errors import AuthlibBaseError
+from authlib.specs.rfc7519 import jwt
 # noinspection PyProtectedMember
 from flask import request, g, _app_ctx_stack
-from requests import HTTPError
+from requests import HTTPError, RequestException
 from werkzeug.local import LocalProxy
 
-from .api_helper import error_response, abort_with_error_response
+from .api_helper import error_response, abort_with_error_response, get_current_org
+from .cache_helper import TTLCache
+from .process_local_helper import process_local_session
 
 
 class TokenInfo(object):
@@ -50,6 +55,255 @@ def check_scopes(required_scopes_structure, granted_scopes_set, major_operator):
         return False
 
 
+# process wide cache of resolved token jsons, keyed by hash of (resolver uri, authorization header).
+token_cache = TTLCache(max_size=10000, ttl=60)
+token_cache_config = {
+    "negative_ttl": 10  # for how long invalid tokens are remembered as invalid
+}
+
+_INVALID_TOKEN = 'INVALID_TOKEN'
+
+# keep-alive connection pool to token resolver, shared by all threads of a worker process.
+resolver_http_config = {
+    "pool_maxsize": 10,  # should be around number of threads per worker
+    "connect_timeout": 3.05,
+    "read_timeout": 10
+}
+_resolver_session = process_local_session(lambda: resolver_http_config['pool_maxsize'])
+
+
+# "remote": always resolve over http. "local": resolve against in-process accounts service.
+# "auto": resolve locally, if accounts service is running in this process, and resolver uri is a loopback.
+resolver_config = {
+    "mode": "auto"
+}
+
+
+# signed (JWT) access tokens are verified locally against accounts' key set, and revocation list.
+signed_tokens_config = {
+    "verify_locally": True,
+    "algorithms": ["RS256", "RS384", "RS512", "ES256", "ES384", "ES512"],
+    "issuer": None  # if set, signed tokens should carry it as "iss".
+}
+jwks_cache = TTLCache(max_size=64, ttl=3600)  # jwks uri -> key set
+revocation_list_cache = TTLCache(max_size=64, ttl=30)  # revocation list uri -> set of revoked token hashes
+
+
+class TokenResolverUnavailable(Exception):
+    pass
+
+
+def configure(accounts_api_config):
+    """
+    configures token resolution for this process from "accounts_api" section of a service's config.
+    settings are process wide, and each call overrides previous ones;
+    hence it is called once at startup, by VedavaapiServices.configure_token_resolution.
+    """
+    cache_config = accounts_api_config.get('token_cache', {})
+    token_cache.configure(max_size=cache_config.get('max_size', None), ttl=cache_config.get('ttl', None))
+    if 'negative_ttl' in cache_config:
+        token_cache_config['negative_ttl'] = cache_config['negative_ttl']
+
+    if 'resolver_mode' in accounts_api_config:
+        resolver_config['mode'] = accounts_api_config['resolver_mode']
+
+    signed_config = accounts_api_config.get('signed_tokens', {})
+    for key in ('verify_locally', 'algorithms', 'issuer'):
+        if key in signed_config:
+            signed_tokens_config[key] = signed_config[key]
+    jwks_cache.configure(ttl=signed_config.get('jwks_ttl', None))
+    revocation_list_cache.configure(ttl=signed_config.get('revocation_list_ttl', None))
+
+    http_config = accounts_api_config.get('http', {})
+    if http_config:
+        resolver_http_config.update(http_config)
+        _resolver_session.discard()
+
+
+def _token_cache_key(token_resolver_uri, authorization_header):
+    key_string = '{} {}'.format(token_resolver_uri, authorization_header)
+    return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
+
+def _token_json_ttl(token_json):
+    # cached token json should not outlive token itself.
+    expires_in = token_json.get('expires_in', None)
+    if expires_in is None:
+        return None
+    issued_at = token_json.get('issued_at', None) or time.time()
+    return issued_at + expires_in - time.time()
+
+
+def _fetch_token_json(token_resolver_uri, authorization_header):
+    try:
+        token_response = _resolver_session.get().get(
+            token_resolver_uri, headers={"Authorization": authorization_header},
+            timeout=(resolver_http_config['connect_timeout'], resolver_http_config['read_timeout']))
+        token_response.raise_for_status()
+        return token_response.json()
+    except HTTPError as e:
+        if e.response.status_code < 500:
+            return None
+        raise TokenResolverUnavailable(str(e))
+    except (RequestException, ValueError) as e:
+        raise TokenResolverUnavailable(str(e))
+
+
+def _local_accounts_service(token_resolver_uri):
+    if resolver_config['mode'] == 'remote':
+        return None
+    from vedavaapi.common import VedavaapiServices
+    accounts_service = VedavaapiServices.lookup('accounts')
+    if accounts_service is None or resolver_config['mode'] == 'local':
+        return accounts_service
+
+    original_url_root = getattr(g, 'original_url_root', None)
+    if not original_url_root or not token_resolver_uri.startswith(original_url_root.lstrip('/')):
+        return None
+    return accounts_service
+
+
+def _resolve_token_json_locally(accounts_service, authorization_header):
+    try:
+        token_type, access_token = authorization_header.split()
+    except ValueError:
+        return None
+    if token_type.upper() != 'BEARER':
+        return None
+    return accounts_service.resolve_token(get_current_org(), access_token)
+
+
+def _sibling_endpoint_uri(token_resolver_uri, endpoint):
+    # jwks, revocation list endpoints are mounted beside token resolver.
+    return '{}/{}'.format(token_resolver_uri.rsplit('/', 1)[0], endpoint)
+
+
+def _fetch_json(uri):
+    try:
+        response = _resolver_session.get().get(
+            uri, timeout=(resolver_http_config['connect_timeout'], resolver_http_config['read_timeout']))
+        response.raise_for_status()
+        return response.json()
+    except (RequestException, ValueError):
+        return None
+
+
+def _get_jwks(token_resolver_uri, accounts_service):
+    jwks_uri = _sibling_endpoint_uri(token_resolver_uri, 'jwks')
+    jwks = jwks_cache.get(jwks_uri)
+    if jwks is not None:
+        return jwks
+
+    if accounts_service is not None:
+        jwks = accounts_service.jwks(get_current_org())
+    else:
+        jwks = _fetch_json(jwks_uri)
+    if jwks is None:
+        return None
+    jwks_cache.set(jwks_uri, jwks)
+    return jwks
+
+
+def _get_revoked_token_hashes(token_resolver_uri, accounts_service):
+    revocation_list_uri = _sibling_endpoint_uri(token_resolver_uri, 'revoked_tokens')
+    revoked_token_hashes = revocation_list_cache.get(revocation_list_uri)
+    if revoked_token_hashes is not None:
+        return revoked_token_hashes
+
+    if accounts_service is not None:
+        revoked_token_hashes = accounts_service.revoked_token_hashes(get_current_org())
+    else:
+        revocation_list = _fetch_json(revocation_list_uri)
+        if revocation_list is None:
+            return None
+        revoked_token_hashes = revocation_list.get('token_hashes', [])
+
+    revoked_token_hashes = frozenset(revoked_token_hashes)
+    revocation_list_cache.set(revocation_list_uri, revoked_token_hashes)
+    return revoked_token_hashes
+
+
+def _verify_signed_token(token_resolver_uri, authorization_header):
+    """
+    verifies signed access token locally.
+    :return: token json, or None if token is not a signed one, or cannot be verified locally.
+        in that case, token should be resolved through token resolver, which remains authoritative.
+    """
+    try:
+        token_type, access_token = authorization_header.split()
+    except ValueError:
+        return None
+    if token_type.upper() != 'BEARER' or access_token.count('.') != 2:
+        return None
+
+    accounts_service = _local_accounts_service(token_resolver_uri)
+    jwks = _get_jwks(token_resolver_uri, accounts_service)
+    if jwks is None:
+        return None
+
+    def key_func(header, payload):
+        if header.get('alg', None) not in signed_tokens_config['algorithms']:
+            raise ValueError('algorithm not allowed')
+        return jwks
+
+    issuer = signed_tokens_config['issuer']
+    claims_options = {"iss": {"essential": True, "value": issuer}} if issuer else None
+    try:
+        claims = jwt.decode(access_token, key_func, claims_options=claims_options)
+        claims.validate()
+    except (AuthlibBaseError, ValueError, KeyError):
+        return None
+    # a token of another org, signed with same key, is not valid here.
+    if claims.get('org', None) != get_current_org():
+        return None
+
+    revoked_token_hashes = _get_revoked_token_hashes(token_resolver_uri, accounts_service)
+    if revoked_token_hashes is None:
+        return None
+    if hashlib.sha256(access_token.encode('utf-8')).hexdigest() in revoked_token_hashes:
+        return None
+
+    return {
+        "access_token": access_token,
+        "client_id": claims.get('client_id'),
+        "user_id": claims.get('user_id', None),
+        "group_ids": claims.get('group_ids', []),
+        "scope": claims.get('scope', None),
+        "issued_at": claims['iat'],
+        "expires_in": claims['exp'] - claims['iat']
+    }
+
+
+def get_token_json(token_resolver_uri, authorization_header):
+    """
+    resolves token json for given authorization header.
+    signed tokens are verified locally; others go over the wire only on cache miss.
+    :return: token json, or None if token is invalid.
+    :raises TokenResolverUnavailable: if token resolver cannot be reached, or fails.
+    """
+    if signed_tokens_config['verify_locally']:
+        token_json = _verify_signed_token(token_resolver_uri, authorization_header)
+        if token_json is not None:
+            return token_json
+
+    cache_key = _token_cache_key(token_resolver_uri, authorization_header)
+    token_json = token_cache.get(cache_key)
+    if token_json is not None:
+        return token_json if token_json != _INVALID_TOKEN else None
+
+    accounts_service = _local_accounts_service(token_resolver_uri)
+    if accounts_service is not None:
+        token_json = _resolve_token_json_locally(accounts_service, authorization_header)
+    else:
+        token_json = _fetch_token_json(token_resolver_uri, authorization_header)
+    if token_json is None:
+        token_cache.set(cache_key, _INVALID_TOKEN, ttl=token_cache_config['negative_ttl'])
+        return None
+
+    token_cache.set(cache_key, token_json, ttl=_token_json_ttl(token_json))
+    return token_json
+
+
 def resolve_token(
         token_resolver_uri, token_required=True,
         required_scopes_structure=None, major_operator='OR', abort_if_scopes_not_satisfied=True):
@@ -64,13 +318,15 @@ def resolve_token(
             ctx.token_info = TokenInfo()
             return
 
-    token_response = requests.get(token_resolver_uri, headers={"Authorization": authorization_header})
     try:
-        token_response.raise_for_status()
-    except HTTPError:
+        token_json = get_token_json(token_resolver_uri, authorization_header)
+    except TokenResolverUnavailable:
+        error = error_response(message='token resolver is unavailable', code=503)
+        abort_with_error_response(error)
+    # noinspection PyUnboundLocalVariable
+    if token_json is None:
         error = error_response(message='invalid authorization', code=403)
         abort_with_error_response(error)
-    token_json = token_response.json()
 
     token_info = TokenInfo(
         access_token=token_json.get('access_token'), user_id=token_json.get('user_id', None),
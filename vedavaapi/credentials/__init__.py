@@ -2,6 +2,8 @@ import os
 
 from vedavaapi.common import VedavaapiService, OrgHandler
 
+from .creds_cache_helper import CredsCache
+
 
 class CredentialsOrgHandler(OrgHandler):
 
@@ -21,23 +23,42 @@ class VedavaapiCredentials(VedavaapiService):
 
     def __init__(self, registry, name, conf):
         super(VedavaapiCredentials, self).__init__(registry, name, conf)
+        self.creds_cache = CredsCache(check_interval=self.config.get('cache', {}).get('check_interval', 5))
 
-    def creds_path(self, org_name, creds_type, provider_name, client_name='default.json', fallback_on_global=True):
-        if client_name is None:
-            client_name = 'default'
-        file_name = '{}.json'.format(client_name)
+    def creds_path(
+            self, org_name, creds_type=None, provider_name=None, client_name=None, fallback_on_global=True,
+            creds_base_path=None):
+        """
+        :param creds_base_path: path relative to creds dir, instead of creds_type/provider_name/client_name.json
+        """
+        if creds_base_path is None:
+            if client_name is None:
+                client_name = 'default'
+            creds_base_path = os.path.join(creds_type, provider_name, '{}.json'.format(client_name))
         if org_name is not None:
-            org_specific_creds_path = self.get_org(org_name).store.file_store_path(
-                'creds',
-                os.path.join(creds_type, provider_name, file_name)
-            )
-            if os.path.exists(org_specific_creds_path):
+            org_specific_creds_path = self.get_org(org_name).store.file_store_path('creds', creds_base_path)
+            if self.creds_cache.exists(org_specific_creds_path):
                 return org_specific_creds_path
         if fallback_on_global:
-            global_creds_path = os.path.join(
-                self.registry.install_path, '_creds',
-                creds_type, provider_name, file_name
-            )
-            if os.path.exists(global_creds_path):
+            global_creds_path = os.path.join(self.registry.install_path, '_creds', creds_base_path)
+            if self.creds_cache.exists(global_creds_path):
                 return global_creds_path
         return None
+
+    def load_creds(self, creds_path):
+        """
+        :return: parsed credentials at creds_path, or None.
+        """
+        if creds_path is None:
+            return None
+        return self.creds_cache.load(creds_path)
+
+    def creds(
+            self, org_name, creds_type=None, provider_name=None, client_name=None, fallback_on_global=True,
+            creds_base_path=None):
+        """
+        parsed equivalent of creds_path.
+        """
+        return self.load_creds(self.creds_path(
+            org_name, creds_type=creds_type, provider_name=provider_name, client_name=client_name,
+            fallback_on_global=fallback_on_global, creds_base_path=creds_base_path))
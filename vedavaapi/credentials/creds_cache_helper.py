@@ -0,0 +1,77 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+
+class CredsCache(object):
+    """
+    cache of parsed credential files, and of their existence.
+    each entry is revalidated against file's (inode, mtime, size), at most once per check_interval,
+    so that credentials rotated on disk are picked up without restart, while lookups in between don't touch filesystem.
+    """
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._entries = {}  # path -> {"checked_at", "stat_key", "value"}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(path):
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as creds_file:
+            return json.loads(creds_file.read().decode('utf-8'))
+
+    def _entry(self, path, parse=False):
+        now = time.monotonic()
+        entry = self._entries.get(path, None)
+        if (
+                entry is not None and now - entry['checked_at'] < self.check_interval
+                and (not parse or entry['stat_key'] is None or 'value' in entry)):
+            return entry
+
+        stat_key = self._stat_key(path)
+        new_entry = {"checked_at": now, "stat_key": stat_key}
+        if entry is not None and entry['stat_key'] == stat_key and 'value' in entry:
+            new_entry['value'] = entry['value']
+        elif parse and stat_key is not None:
+            try:
+                new_entry['value'] = self._read(path)
+            except (ValueError, FileNotFoundError) as e:
+                if entry is None or 'value' not in entry:
+                    raise
+                # may be midway of a rotation; serve previous value, and retry after interval.
+                logging.warning('cannot read credentials at {}, serving previous: {}'.format(path, e))
+                new_entry = dict(entry, checked_at=now)
+
+        with self._lock:
+            self._entries[path] = new_entry
+        return new_entry
+
+    def exists(self, path):
+        return self._entry(path)['stat_key'] is not None
+
+    def load(self, path):
+        """
+        :return: parsed credentials at path, or None if there is no such file.
+        """
+        entry = self._entry(path, parse=True)
+        if entry['stat_key'] is None:
+            return None
+        return copy.deepcopy(entry['value'])
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
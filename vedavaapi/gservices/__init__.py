@@ -3,12 +3,19 @@ import json
 from vedavaapi.common import VedavaapiService, OrgHandler
 from vedavaapi.google_helper import GServices
 
+from .access_token_helper import AccessTokenCache, AccessTokenError
+from .response_cache_helper import ResponseCache
 
-def load_creds_config(creds_path):
+
+def load_creds_config(creds_path, creds=None):
+    """
+    :param creds: parsed credentials at creds_path, if already at hand.
+    """
     if creds_path is None:
         return None
     try:
-        creds = json.loads(open(creds_path, 'rb').read().decode('utf-8'))
+        if creds is None:
+            creds = json.loads(open(creds_path, 'rb').read().decode('utf-8'))
         auth_through_service_account = (creds.get('type', None) == 'service_account')
         scopes = creds['scopes'] if not auth_through_service_account else VedavaapiGservices.service_account_default_scopes
         return {
@@ -24,11 +31,13 @@ class GservicesOrgHandler(OrgHandler):
 
     def __init__(self, service, org_name):
         super(GservicesOrgHandler, self).__init__(service, org_name)
-        self.authorized_creds_path = self.service.registry.lookup('credentials').creds_path(
+        credentials_service = self.service.registry.lookup('credentials')
+        self.authorized_creds_path = credentials_service.creds_path(
             org_name=org_name,
             creds_base_path=self.service.config['authorized_creds_base_path']
         )
-        self.creds_config = load_creds_config(self.authorized_creds_path)
+        self.creds_config = load_creds_config(
+            self.authorized_creds_path, creds=credentials_service.load_creds(self.authorized_creds_path))
 
     def services(self):
         if not hasattr(self, 'gservices_object'):
@@ -53,6 +62,11 @@ class VedavaapiGservices(VedavaapiService):
 
     def __init__(self, registry, name, conf):
         super(VedavaapiGservices, self).__init__(registry, name, conf)
+        self.access_token_cache = AccessTokenCache.from_config(self.config.get('access_token_cache', {}))
+        response_cache_config = dict(self.config.get('response_cache', {}))
+        self.response_cache = (
+            ResponseCache.from_config(response_cache_config)
+            if response_cache_config.pop('enabled', True) else None)
 
     def creds_path(self, org_name):
         # to be used by it's api
@@ -64,12 +78,38 @@ class VedavaapiGservices(VedavaapiService):
                 creds_base_path=self.config['authorized_creds_base_path']
             )
 
+    def creds_dict(self, org_name):
+        # parsed authorized creds, revalidated against file by credentials service.
+        return self.registry.lookup('credentials').load_creds(self.creds_path(org_name))
+
+    def access_token(self, org_name):
+        """
+        :return: (token_type, access_token) for org's authorized creds, cached till shortly before it's expiry.
+        :raises AccessTokenError:
+        """
+        creds = self.creds_dict(org_name)
+        if creds is None:
+            raise AccessTokenError('no authorized credentials configured')
+        return self.access_token_cache.get(org_name, creds)
+
+    def invalidate_access_token(self, org_name):
+        creds = self.creds_dict(org_name)
+        if creds is not None:
+            self.access_token_cache.invalidate(org_name, creds)
+
+    def file_version(self, org_name, file_id):
+        # drive's version of a file increases on every change to it, including to sheet values.
+        file_json = self.services(org_name).gdrive().drive_service.files().get(
+            fileId=file_id, fields='version').execute()
+        return file_json.get('version', None)
+
     def services(self, org_name, custom_conf=None):
         if org_name is not None:
             if custom_conf is None:
                 return self.get_org(org_name).services()
 
-        effective_conf = load_creds_config(self.creds_path(org_name=org_name))
+        creds_path = self.creds_path(org_name=org_name)
+        effective_conf = load_creds_config(creds_path, creds=self.registry.lookup('credentials').load_creds(creds_path))
         if custom_conf is not None:
             effective_conf.update(custom_conf)
         return GServices.from_creds_file(**effective_conf)
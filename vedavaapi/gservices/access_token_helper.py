@@ -0,0 +1,136 @@
+"""
+process wide cache of google access tokens, obtained from authorized (refresh token) credentials of each org.
+a token is refreshed a little before it expires, with only one refresh in flight per credential;
+concurrent requests wait for, and share it's result.
+token endpoint is taken from credentials' "token_uri", so that a local stand in can be used offline.
+it's pooled session and timeouts are also used for api requests made with these tokens.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+
+from requests import RequestException
+
+from vedavaapi.common.helpers.process_local_helper import process_local_session
+
+
+class AccessTokenError(Exception):
+    pass
+
+
+class AccessTokenCache(object):
+
+    def __init__(
+            self, refresh_margin=60, failure_backoff=5, default_expires_in=3600,
+            connect_timeout=3.05, read_timeout=10, pool_maxsize=10):
+        """
+        :param refresh_margin: seconds before expiry, at which token is refreshed.
+        :param failure_backoff: seconds after a failed refresh, during which refresh is not retried,
+            and still valid token (if any) is served.
+        :param connect_timeout, read_timeout: for token, and api requests.
+        """
+        self.refresh_margin = refresh_margin
+        self.failure_backoff = failure_backoff
+        self.default_expires_in = default_expires_in
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+        self._entries = {}  # (org_name, credential hash) -> {"token_type", "access_token", "expires_at"}
+        self._failed_until = {}
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        self._session = process_local_session(lambda: self.pool_maxsize)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config)
+
+    def session(self):
+        return self._session.get()
+
+    def _key_lock(self, key):
+        with self._key_locks_lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    @staticmethod
+    def _key(org_name, creds):
+        # keyed by credential itself, so that rotated credentials don't get tokens of previous ones.
+        credential_string = '{} {} {}'.format(
+            creds.get('token_uri', ''), creds.get('client_id', ''), creds.get('refresh_token', ''))
+        return org_name, hashlib.sha256(credential_string.encode('utf-8')).hexdigest()
+
+    def _is_fresh(self, entry, now):
+        return entry is not None and entry['expires_at'] - self.refresh_margin > now
+
+    def _refresh(self, creds):
+        self.refreshes += 1
+        access_token_request_data = {
+            'grant_type': 'refresh_token',
+            'refresh_token': creds['refresh_token'],
+            'client_id': creds['client_id'],
+            'client_secret': creds['client_secret']
+        }
+        requested_at = time.time()
+        try:
+            atr = self.session().post(creds['token_uri'], data=access_token_request_data, timeout=self.timeout)
+            atr.raise_for_status()
+            atr_json = atr.json()
+            access_token = atr_json['access_token']
+        except (RequestException, ValueError, KeyError) as e:
+            self.refresh_failures += 1
+            raise AccessTokenError('cannot refresh access token: {}'.format(e))
+
+        return {
+            "token_type": atr_json.get('token_type', 'Bearer'),
+            "access_token": access_token,
+            "expires_at": requested_at + atr_json.get('expires_in', self.default_expires_in)
+        }
+
+    def get(self, org_name, creds):
+        """
+        :param creds: authorized user credentials, with refresh_token, client_id, client_secret, token_uri
+        :return: (token_type, access_token)
+        :raises AccessTokenError: if token could neither be refreshed, nor is there a still valid one.
+        """
+        key = self._key(org_name, creds)
+        entry = self._entries.get(key, None)
+        if self._is_fresh(entry, time.time()):
+            return entry['token_type'], entry['access_token']
+
+        with self._key_lock(key):
+            now = time.time()
+            entry = self._entries.get(key, None)
+            if self._is_fresh(entry, now):
+                # refreshed by another request, while we were waiting.
+                return entry['token_type'], entry['access_token']
+
+            if self._failed_until.get(key, 0) <= now:
+                try:
+                    entry = self._refresh(creds)
+                    self._entries[key] = entry
+                    self._failed_until.pop(key, None)
+                    return entry['token_type'], entry['access_token']
+                except AccessTokenError as e:
+                    self._failed_until[key] = now + self.failure_backoff
+                    logging.warning('refresh of access token for org {} failed: {}'.format(org_name, e))
+                    error = e
+            else:
+                error = AccessTokenError('access token refresh is backing off after a failure')
+
+            if entry is not None and entry['expires_at'] > now:
+                # within refresh margin, but still valid.
+                return entry['token_type'], entry['access_token']
+            raise error
+
+    def invalidate(self, org_name, creds):
+        # for when api rejects a cached token, like after it's revocation.
+        self._entries.pop(self._key(org_name, creds), None)
+
+    def stats(self):
+        return {"tokens": len(self._entries), "refreshes": self.refreshes, "refresh_failures": self.refresh_failures}
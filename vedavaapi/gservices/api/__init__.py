@@ -1,8 +1,10 @@
-import json
+import flask
+import requests
 
-from vedavaapi.common.helpers.api_helper import get_current_org
+from vedavaapi.common.helpers.api_helper import get_current_org, error_response
 
 from .. import VedavaapiGservices
+from ..response_cache_helper import conditional_response
 
 '''
 any common little functionality that can be used in all versions should be here, and nothing else.
@@ -14,10 +16,118 @@ def myservice():
 
 
 def creds_dict():
-    credentials_dict = json.load(open(myservice().creds_path(get_current_org())))
+    credentials_dict = myservice().creds_dict(get_current_org())
     return credentials_dict
 
 
+def authorized_api_get(url, params=None, headers=None, **kwargs):
+    """
+    GETs google api url, with cached access token of current org.
+    if token is rejected, like after it's revocation, retries once with a fresh one.
+    request is made through token cache's pooled session, with it's timeouts, unless timeout is given.
+    :raises AccessTokenError:
+    :raises requests.RequestException:
+    """
+    org_name = get_current_org()
+    access_token_cache = myservice().access_token_cache
+    kwargs.setdefault('timeout', access_token_cache.timeout)
+    for attempt in (1, 2):
+        token_type, access_token = myservice().access_token(org_name)
+        request_headers = dict(headers or {}, Authorization='{} {}'.format(token_type, access_token))
+        api_response = access_token_cache.session().get(url, params=params, headers=request_headers, **kwargs)
+        if api_response.status_code != 401 or attempt == 2:
+            return api_response
+        api_response.close()
+        myservice().invalidate_access_token(org_name)
+
+
+def upstream_request_error_response(e):
+    # request to google api could not be made, or stalled beyond timeout.
+    return error_response(
+        message='upstream api request failed: {}'.format(type(e).__name__),
+        code=504 if isinstance(e, requests.Timeout) else 502)
+
+
+def cached_response(endpoint, parts, args, fetch, versioned_file_id=None):
+    """
+    serves fetch's (body, code) through org's response cache, with ETag, and 304 to conditional requests.
+    :param versioned_file_id: drive file, whose version is checked to revalidate cached response.
+    """
+    response_cache = myservice().response_cache
+    if response_cache is None:
+        return fetch()
+
+    org_name = get_current_org()
+    validator_func = (
+        (lambda: myservice().file_version(org_name, versioned_file_id)) if versioned_file_id is not None else None)
+    body, code, etag = response_cache.get(
+        response_cache.key(org_name, endpoint, *parts, **args), fetch, validator_func=validator_func)
+    return conditional_response(body, code, etag)
+
+
+def raw_proxy_config():
+    return dict({"stream": True, "chunk_size": 65536}, **myservice().config.get('raw_proxy', {}))
+
+
+def proxy_request_headers(stream=False):
+    # body is relayed undecoded when streaming, hence upstream should encode it only as client accepts.
+    if not stream:
+        return {}
+    return {'Accept-Encoding': flask.request.headers.get('Accept-Encoding', 'identity')}
+
+
+def _upstream_error_response(api_response):
+    try:
+        response_json = api_response.json()
+    except ValueError:
+        response_json = None
+    if isinstance(response_json, dict) and isinstance(response_json.get('error', None), dict):
+        return error_response(inherited_error_response=response_json)
+    return error_response(message='upstream api error', code=api_response.status_code)
+
+
+def _passthrough_headers(api_response):
+    headers = {}
+    for header in ('Content-Type', 'Content-Encoding', 'Content-Length'):
+        if header in api_response.headers:
+            headers[header] = api_response.headers[header]
+    return headers
+
+
+def proxy_response(api_response, stream=False, chunk_size=65536):
+    """
+    relays response of a google api to client.
+    if stream, body of a successful response is piped through chunk by chunk, undecoded,
+    with it's original content type and encoding. only error responses, detected by status, are parsed.
+    api_response should have been requested with stream=True, for this to avoid buffering.
+    """
+    if not stream:
+        try:
+            response_json = api_response.json()
+        except ValueError:
+            return _upstream_error_response(api_response)
+        if 'error' in response_json:
+            return _upstream_error_response(api_response)
+        return response_json, api_response.status_code
+
+    if api_response.status_code >= 400:
+        try:
+            return _upstream_error_response(api_response)
+        finally:
+            api_response.close()
+
+    def body_chunks():
+        try:
+            for chunk in api_response.raw.stream(chunk_size, decode_content=False):
+                yield chunk
+        finally:
+            api_response.close()
+
+    return flask.Response(
+        body_chunks(), status=api_response.status_code, headers=_passthrough_headers(api_response),
+        direct_passthrough=True)
+
+
 from .v1 import api_blueprint_v1
 
 
@@ -1,10 +1,12 @@
-import requests
 from flask import request
 from flask_restplus import Resource, Namespace, reqparse
+from requests import RequestException
 
 from vedavaapi.common.helpers.api_helper import error_response, get_current_org
 
-from .. import creds_dict, myservice
+from .. import myservice, authorized_api_get, cached_response, proxy_response, raw_proxy_config, proxy_request_headers
+from .. import upstream_request_error_response
+from ...access_token_helper import AccessTokenError
 
 
 def gdrive():
@@ -26,29 +28,19 @@ class Raw(Resource):
             values = qparams.getlist(key)
             params[key] = values[0] if len(values) == 1 else values
 
-        access_token_request_data = {
-            'grant_type': 'refresh_token',
-            'refresh_token': creds_dict()['refresh_token'],
-            'client_id': creds_dict()['client_id'],
-            'client_secret': creds_dict()['client_secret']
-        }
-
-        atr = requests.post(creds_dict()['token_uri'], data=access_token_request_data)
-        access_token = atr.json().get('access_token', creds_dict()['token'])
-        print(access_token)
-
         drive_api_uri_prefix = 'https://www.googleapis.com/drive/v3/'
         drive_request_url = drive_api_uri_prefix + path
-        auth_headers = {'Authorization': atr.json().get('token_type') + ' ' + access_token}
-        api_response = requests.get(drive_request_url, params=params, headers=auth_headers)
-
-        response_json = api_response.json()
-        response_code = api_response.status_code
+        proxy_config = raw_proxy_config()
+        try:
+            api_response = authorized_api_get(
+                drive_request_url, params=params,
+                headers=proxy_request_headers(proxy_config['stream']), stream=proxy_config['stream'])
+        except AccessTokenError as e:
+            return error_response(message=str(e), code=502)
+        except RequestException as e:
+            return upstream_request_error_response(e)
 
-        if 'error' in response_json:
-            return error_response(inherited_error_table=response_json)
-
-        return response_json, response_code
+        return proxy_response(api_response, stream=proxy_config['stream'], chunk_size=proxy_config['chunk_size'])
 
 
 @gdrive_ns.route('/folder/<folderId>')
@@ -68,6 +60,8 @@ class Folder(Resource):
 
     def get(self, folderId):
         additional_args = self.reqparser.parse_args()
-        response_table, code = gdrive().list_of_files_in_folder(folder_id=folderId, mime_types=additional_args.pop('mimeType'), additional_pargs=additional_args)
-
-        return response_table, code
+        # folder's own version doesn't change with it's children, hence listings are cached only till ttl.
+        return cached_response(
+            'folder', (folderId, ), additional_args,
+            lambda: gdrive().list_of_files_in_folder(
+                folder_id=folderId, mime_types=additional_args.pop('mimeType'), additional_pargs=additional_args))
@@ -1,10 +1,15 @@
-import requests
-from flask import request
+import json
+
+from flask import request, Response
 from flask_restplus import Resource, Namespace, reqparse
+from requests import RequestException
 
 from vedavaapi.common.helpers.api_helper import error_response, get_current_org
 
-from .. import myservice, creds_dict
+from .. import myservice, authorized_api_get, cached_response, proxy_response, raw_proxy_config, proxy_request_headers
+from .. import upstream_request_error_response
+from ... import sheet_values_helper
+from ...access_token_helper import AccessTokenError
 
 
 def gsheets():
@@ -26,29 +31,19 @@ class Raw(Resource):
             values = qparams.getlist(key)
             params[key] = values[0] if len(values) == 1 else values
 
-        access_token_request_data = {
-            'grant_type': 'refresh_token',
-            'refresh_token': creds_dict()['refresh_token'],
-            'client_id': creds_dict()['client_id'],
-            'client_secret': creds_dict()['client_secret']
-        }
-
-        atr = requests.post(creds_dict()['token_uri'], data=access_token_request_data)
-        access_token = atr.json().get('access_token', creds_dict()['token'])
-        print(access_token)
-
         sheets_api_uri_prefix = 'https://sheets.googleapis.com/v4/spreadsheets/'
         sheets_request_url = sheets_api_uri_prefix + path
-        auth_headers = {'Authorization': atr.json().get('token_type') + ' ' + access_token}
-        api_response = requests.get(sheets_request_url, params=params, headers=auth_headers)
-
-        response_json = api_response.json()
-        response_code = api_response.status_code
-
-        if 'error' in response_json:
-            return error_response(inherited_error_table=response_json)
+        proxy_config = raw_proxy_config()
+        try:
+            api_response = authorized_api_get(
+                sheets_request_url, params=params,
+                headers=proxy_request_headers(proxy_config['stream']), stream=proxy_config['stream'])
+        except AccessTokenError as e:
+            return error_response(message=str(e), code=502)
+        except RequestException as e:
+            return upstream_request_error_response(e)
 
-        return response_json, response_code
+        return proxy_response(api_response, stream=proxy_config['stream'], chunk_size=proxy_config['chunk_size'])
 
 
 @gsheets_ns.route('/<spreadsheetId>')
@@ -58,8 +53,21 @@ class Spreadsheet(Resource):
                            help='whether to include sheet header details in response or not. give integer 1 or 0')
 
     def get(self, spreadsheetId):
-        response_table, code = gsheets().spreadsheet_details_for(spreadsheetId, pargs=self.reqparser.parse_args())
-        return response_table, code
+        args = self.reqparser.parse_args()
+        return cached_response(
+            'spreadsheet', (spreadsheetId, ), args,
+            lambda: gsheets().spreadsheet_details_for(spreadsheetId, pargs=args), versioned_file_id=spreadsheetId)
+
+
+def _ndjson_sheet_values(spreadsheet_id, sheet_id, args):
+    docs, error = sheet_values_helper.stream_sheet_values(
+        gsheets(), spreadsheet_id, sheet_id, pargs=args,
+        window_size=myservice().config.get('sheet_values_stream', {}).get('window_size', 5000))
+    if error is not None:
+        return error
+
+    lines = (json.dumps(doc, ensure_ascii=False) + '\n' for doc in docs)
+    return Response(lines, mimetype='application/x-ndjson')
 
 
 @gsheets_ns.route('/<spreadsheetId>/<sheetId>')
@@ -85,9 +93,19 @@ class Sheet(Resource):
     )
 
     reqparser.add_argument('range', location='args', help='range of rows in required sheet')
+    reqparser.add_argument(
+        'stream', location='args', type=int, choices=[0, 1], default=0,
+        help='if 1 (or if "Accept: application/x-ndjson"), values are streamed as ndjson. first line has fields and other details, and each following line is a row or map. not available for "columns" format.')
 
     def get(self, spreadsheetId, sheetId):
-        response_table, code = gsheets().sheet_values_for(spreadsheetId, sheetId, pargs=self.reqparser.parse_args())
-
-        return response_table, code
+        args = self.reqparser.parse_args()
+        stream = args.pop('stream') or request.accept_mimetypes.best_match(
+            ['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+        if stream:
+            return _ndjson_sheet_values(spreadsheetId, sheetId, args)
+
+        return cached_response(
+            'sheet', (spreadsheetId, sheetId), args,
+            lambda: sheet_values_helper.sheet_values_for(gsheets(), spreadsheetId, sheetId, pargs=args),
+            versioned_file_id=spreadsheetId)
 
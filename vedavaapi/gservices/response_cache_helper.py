@@ -0,0 +1,95 @@
+"""
+per org cache of responses of gsheets, gdrive endpoints.
+sheets api doesn't support conditional requests, hence a cached response is revalidated upstream
+against drive "version" of it's file, which changes on every edit, and costs a tiny metadata request.
+to own clients, each cached response carries an ETag, and conditional requests get 304.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+import flask
+
+from vedavaapi.common.helpers.cache_helper import TTLCache
+
+
+class ResponseCache(object):
+
+    def __init__(self, max_size=256, ttl=3600, revalidate_after=60):
+        """
+        :param ttl: seconds, after which a response is fetched afresh regardless of it's version.
+        :param revalidate_after: seconds, for which a response is served without any upstream request.
+            responses without a validator (like folder listings) are served till ttl.
+        """
+        self.revalidate_after = revalidate_after
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.revalidations = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config)
+
+    @staticmethod
+    def key(org_name, endpoint, *parts, **args):
+        return org_name, endpoint, parts, json.dumps(args, sort_keys=True, default=str)
+
+    @staticmethod
+    def _etag(body):
+        return hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, key, fetch, validator_func=None):
+        """
+        :param fetch: callable returning (body, code), as google_helper methods do.
+        :param validator_func: callable returning a token, which changes whenever response would;
+            or None if it cannot be determined.
+        :return: (body, code, etag); etag is None for uncached (error) responses.
+        """
+        now = time.time()
+        entry = self._cache.get(key, None)
+        if entry is not None and now - entry['validated_at'] < self.revalidate_after:
+            return entry['body'], entry['code'], entry['etag']
+
+        validator = None
+        if validator_func is not None:
+            try:
+                validator = validator_func()
+            except Exception as e:
+                logging.warning('cannot get validator of {}: {}'.format(key, e))
+            if entry is not None:
+                self.revalidations += 1
+                if validator is None or validator == entry['validator']:
+                    # unchanged, or cannot tell; ttl still bounds staleness.
+                    entry['validated_at'] = now
+                    return entry['body'], entry['code'], entry['etag']
+
+        body, code = fetch()
+        if code != 200:
+            return body, code, None
+        # validator is taken before fetch, so that an edit in between is caught by next revalidation.
+        entry = {
+            "body": body, "code": code, "etag": self._etag(body), "validator": validator, "validated_at": now}
+        self._cache.set(key, entry)
+        return body, code, entry['etag']
+
+    def invalidate(self, key):
+        self._cache.pop(key)
+
+    def stats(self):
+        return {"hits": self._cache.hits, "misses": self._cache.misses, "revalidations": self.revalidations}
+
+
+def conditional_response(body, code, etag):
+    """
+    :param etag: unquoted etag.
+    :return: 304, if request's If-None-Match matches etag; else response with ETag header.
+    """
+    if etag is None:
+        return body, code
+    etag_header = '"{}"'.format(etag)
+    if flask.request.if_none_match.contains_weak(etag):
+        response = flask.make_response('', 304)
+        response.headers['ETag'] = etag_header
+        return response
+    return body, code, {'ETag': etag_header}
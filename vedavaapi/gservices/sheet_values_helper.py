@@ -0,0 +1,275 @@
+"""
+columnar equivalent of GSheets.sheet_values_for.
+rows are filtered in bulk, and transposed into columns once, with C level zip;
+field selection, and each of rows/columns/maps formats are then derived from selected columns,
+instead of indexing every cell of every row in python loops, and building all three formats for each request.
+large sheets can also be streamed, fetched window by window.
+"""
+
+import re
+from itertools import zip_longest
+
+
+_range_regex = re.compile(r'^(\d+):(\d+)$')
+_filler_regex = re.compile(r'^[\s\-]*$')
+
+values_formats = ['rows', 'columns', 'maps']
+
+
+def _error(code, message=None, inherited_error_table=None):
+    # same shape as google_helper's error responses
+    error = {"code": code}
+    if message is not None:
+        error['message'] = message
+    if inherited_error_table is not None:
+        error['inherited_error'] = inherited_error_table.get('error', inherited_error_table)
+    return {"error": error}, code
+
+
+def _is_skipped(row, filter_hashes):
+    if not row:
+        return True
+    first_cell = row[0]
+    if filter_hashes and isinstance(first_cell, str) and first_cell.startswith('#'):
+        return True
+    # a row is filler, iff each of it's cells is; hence matched over joined cells at once.
+    return _filler_regex.match(''.join(map(str, row))) is not None
+
+
+def parse_headers(headers_row, filter_hashes=True, hdr_split_char=' '):
+    """
+    :return: (fields, descs)
+    """
+    headers_row = [str(h).lstrip() for h in headers_row]
+    if filter_hashes and headers_row and headers_row[0].startswith('#'):
+        headers_row[0] = headers_row[0][1:]
+    split_headers = [h.split(hdr_split_char, 1) if hdr_split_char in h else [h, ''] for h in headers_row]
+    return [s[0] for s in split_headers], [s[1] for s in split_headers]
+
+
+def values_columns(rows, width, filter_hashes=True):
+    """
+    transposes rows into columns, after filtering out comment and filler rows.
+    ragged rows are padded with ''. there are at least width columns.
+    """
+    rows = [row for row in rows if not _is_skipped(row, filter_hashes)]
+    columns = list(zip_longest(*rows, fillvalue=''))
+    if len(columns) < width:
+        columns.extend([('', ) * len(rows)] * (width - len(columns)))
+    return columns, len(rows)
+
+
+def format_values(fields, columns, rows_count, values_format):
+    if values_format == 'columns':
+        return [list(column) for column in columns]
+    if not columns:
+        return [[] for i in range(rows_count)] if values_format == 'rows' else [{} for i in range(rows_count)]
+    if values_format == 'rows':
+        return [list(row) for row in zip(*columns)]
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
+
+def select_fields(headers_row, reqd_fields=None, filter_hashes=True, hdr_split_char=' '):
+    """
+    :return: ((fields, descs, indices of selected fields, number of fields), None), or (None, error response)
+    """
+    fields, descs = parse_headers(headers_row, filter_hashes=filter_hashes, hdr_split_char=hdr_split_char)
+    field_indices = dict(zip(fields, range(len(fields))))
+
+    reqd_fields = fields if reqd_fields is None else reqd_fields
+    fields_not_existed = [f for f in reqd_fields if f not in field_indices]
+    if fields_not_existed:
+        return None, _error(
+            404, 'fields {} doesn\'t exist in requested sheet.'.format(','.join(fields_not_existed)))
+
+    reqd_indices = [field_indices[f] for f in reqd_fields]
+    return ([fields[i] for i in reqd_indices], [descs[i] for i in reqd_indices], reqd_indices, len(fields)), None
+
+
+def format_rows(rows, width, reqd_fields, reqd_indices, values_format, filter_hashes=True):
+    columns, rows_count = values_columns(rows, width, filter_hashes=filter_hashes)
+    return format_values(reqd_fields, [columns[i] for i in reqd_indices], rows_count, values_format)
+
+
+def tabulate(headers_row, rows, reqd_fields=None, values_format='maps', filter_hashes=True, hdr_split_char=' '):
+    """
+    :return: ((fields, descs, values), None), or (None, error response)
+    """
+    selection, error = select_fields(
+        headers_row, reqd_fields=reqd_fields, filter_hashes=filter_hashes, hdr_split_char=hdr_split_char)
+    if error is not None:
+        return None, error
+    fields, descs, reqd_indices, width = selection
+    values = format_rows(rows, width, fields, reqd_indices, values_format, filter_hashes=filter_hashes)
+    return (fields, descs, values), None
+
+
+def _resolve_request(gsheets, spreadsheet_id, sheet_id, pargs):
+    """
+    validates parameters, and resolves requested sheet.
+    :return: (request dict, None), or (None, error response)
+    """
+    request = {
+        "id_type": pargs.get('idType', None) or 'gid',
+        "values_format": pargs.get('valuesFormat', None) or 'maps',
+        "reqd_fields": pargs.get('fields', None),
+        "value_render_option": pargs.get('valueRenderOption', None) or 'FORMATTED_VALUE',
+        "date_time_render_option": pargs.get('dateTimeRenderOption', None) or 'SERIAL_NUMBER',
+        "range": None
+    }
+
+    reqd_range_str = pargs.get('range', None)
+    if reqd_range_str:
+        reqd_range_match = _range_regex.match(reqd_range_str)
+        if reqd_range_match is None or int(reqd_range_match.group(1)) < 1:
+            return None, _error(400, 'illegal range')
+        # first row is header, hence range of values is shifted by one.
+        request['range'] = (int(reqd_range_match.group(1)) + 1, int(reqd_range_match.group(2)) + 1)
+    if request['id_type'] not in ['gid', 'title']:
+        return None, _error(400, 'invalid idType parameter')
+    if request['values_format'] not in values_formats:
+        return None, _error(400, 'invalid valuesFormat parameter')
+    if request['value_render_option'] not in ['FORMATTED_VALUE', 'UNFORMATTED_VALUE', 'FORMULA']:
+        return None, _error(400, 'invalid valueRenderOption parameter')
+    if request['date_time_render_option'] not in ['SERIAL_NUMBER', 'FORMATTED_STRING']:
+        return None, _error(400, 'invalid dateTimeRenderOption parameter')
+
+    if request['id_type'] == 'gid':
+        try:
+            sheet_id = int(sheet_id)
+        except ValueError:
+            return None, _error(400, 'invalid sheet gid')
+
+    spreadsheet_json, code = gsheets.raw_get(spreadsheet_id)
+    if code != 200:
+        return None, _error(code, 'error in getting sheets details in requested spreadsheet', spreadsheet_json)
+
+    sheet_properties = None
+    for sheet in spreadsheet_json.get('sheets', []):
+        properties = sheet['properties']
+        if properties['sheetId' if request['id_type'] == 'gid' else 'title'] == sheet_id:
+            sheet_properties = properties
+            break
+    if sheet_properties is None:
+        return None, _error(404, 'requested sheet is not there in parent spreadsheet')
+
+    request.update({
+        "sheet_gid": sheet_properties['sheetId'],
+        "sheet_title": sheet_properties['title'],
+        "row_count": sheet_properties.get('gridProperties', {}).get('rowCount', None)
+    })
+    return request, None
+
+
+def _render_pargs(request):
+    return {
+        "valueRenderOption": request['value_render_option'],
+        "dateTimeRenderOption": request['date_time_render_option']
+    }
+
+
+def _response_json(spreadsheet_id, request, fields, descs):
+    return {
+        "spreadsheetId": spreadsheet_id,
+        "sheetGId": request['sheet_gid'],
+        "sheetTitle": request['sheet_title'],
+        "valuesFormat": request['values_format'],
+        "fields": fields,
+        "fieldDescs": descs
+    }
+
+
+def sheet_values_for(gsheets, spreadsheet_id, sheet_id, pargs=None, filter_hashes=True, hdr_split_char=' '):
+    """
+    drop in for gsheets.sheet_values_for, with same parameters (in pargs), response and errors.
+    :param gsheets: google_helper's GSheets object
+    """
+    request, error = _resolve_request(gsheets, spreadsheet_id, sheet_id, pargs or {})
+    if error is not None:
+        return error
+
+    sheet_title = request['sheet_title']
+    reqd_range = '{}!{}:{}'.format(sheet_title, *request['range']) if request['range'] else '{}!2:2000000'.format(
+        sheet_title)
+
+    values_json, code = gsheets.raw_values_batch_get(
+        spreadsheet_id, ['{}!1:1'.format(sheet_title), reqd_range], pargs=_render_pargs(request))
+    if code != 200:
+        return _error(code, 'error in getting sheet values in requested spreadsheet', values_json)
+
+    value_ranges = values_json.get('valueRanges', [])
+    headers_values = value_ranges[0].get('values', []) if value_ranges else []
+    if not headers_values or not headers_values[0]:
+        return _error(404, 'requested sheet is empty')
+    rows = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+
+    tabulated, error = tabulate(
+        headers_values[0], rows, reqd_fields=request['reqd_fields'], values_format=request['values_format'],
+        filter_hashes=filter_hashes, hdr_split_char=hdr_split_char)
+    if error is not None:
+        return error
+    fields, descs, values = tabulated
+
+    response_json = _response_json(spreadsheet_id, request, fields, descs)
+    response_json['values'] = values
+    return response_json, 200
+
+
+'''
+streaming of sheet values, fetched in fixed size windows of rows
+'''
+
+
+def stream_sheet_values(
+        gsheets, spreadsheet_id, sheet_id, pargs=None, window_size=5000, filter_hashes=True, hdr_split_char=' '):
+    """
+    parameters are same as of sheet_values_for. "columns" format cannot be streamed.
+    values are fetched by range, window_size rows at a time, so that memory stays bounded regardless of sheet size.
+    errors in parameters, or before first window, are returned as usual.
+    :return: (generator of json docs, None), or (None, error response).
+        first doc is response of sheet_values_for without "values"; each following doc is a row (or map).
+        if a later window cannot be fetched, an {"error": ...} doc is yielded last.
+    """
+    pargs = pargs or {}
+    if (pargs.get('valuesFormat', None) or 'maps') == 'columns':
+        return None, _error(400, 'columns valuesFormat cannot be streamed')
+
+    request, error = _resolve_request(gsheets, spreadsheet_id, sheet_id, pargs)
+    if error is not None:
+        return None, error
+    sheet_title = request['sheet_title']
+
+    headers_json, code = gsheets.raw_values_get(
+        spreadsheet_id, '{}!1:1'.format(sheet_title), pargs=_render_pargs(request))
+    if code != 200:
+        return None, _error(code, 'error in getting sheet values in requested spreadsheet', headers_json)
+    headers_values = headers_json.get('values', [])
+    if not headers_values or not headers_values[0]:
+        return None, _error(404, 'requested sheet is empty')
+
+    selection, error = select_fields(
+        headers_values[0], reqd_fields=request['reqd_fields'],
+        filter_hashes=filter_hashes, hdr_split_char=hdr_split_char)
+    if error is not None:
+        return None, error
+    fields, descs, reqd_indices, width = selection
+
+    first_row, last_row = request['range'] or (2, request['row_count'] or 2000000)
+
+    def docs():
+        yield _response_json(spreadsheet_id, request, fields, descs)
+        window_start = first_row
+        while window_start <= last_row:
+            window_end = min(window_start + window_size - 1, last_row)
+            window_json, window_code = gsheets.raw_values_get(
+                spreadsheet_id, '{}!{}:{}'.format(sheet_title, window_start, window_end), pargs=_render_pargs(request))
+            if window_code != 200:
+                yield _error(window_code, 'error in getting sheet values in requested spreadsheet', window_json)[0]
+                return
+            for doc in format_rows(
+                    window_json.get('values', []), width, fields, reqd_indices, request['values_format'],
+                    filter_hashes=filter_hashes):
+                yield doc
+            window_start = window_end + 1
+
+    return docs(), None
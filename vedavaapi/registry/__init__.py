@@ -27,6 +27,8 @@ class RegistryOrgHandler(OrgHandler):
 class VedavaapiRegistry(VedavaapiService):
     instance = None
     org_handler_class = RegistryOrgHandler
+    # bootstrap of an org needs it's initial agents from accounts.
+    dependency_services = ['accounts']
 
     title = 'Vedavaapi Registry'
     description = 'Registry service.'
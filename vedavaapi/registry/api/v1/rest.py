@@ -5,6 +5,7 @@ from jsonschema import ValidationError
 from sanskrit_ld.schema.services import VedavaapiService
 
 from vedavaapi.objectdb.helpers import ObjModelException, projection_helper, objstore_helper
+from vedavaapi.common.helpers import permissions_helper
 from vedavaapi.common.helpers.api_helper import jsonify_argument, check_argument_type, error_response, get_initial_agents
 from vedavaapi.common.helpers.token_helper import require_oauth, current_token
 
@@ -42,7 +43,7 @@ class Services(flask_restplus.Resource):
         selector_doc = filter_doc.copy()
         selector_doc.update({"jsonClass": VedavaapiService.json_class})
         try:
-            service_jsons = objstore_helper.get_read_permitted_resource_jsons(
+            service_jsons = permissions_helper.get_read_permitted_resource_jsons(
                 g.registry_colln, current_token.user_id, current_token.group_ids, selector_doc)
         except ObjModelException as e:
             return error_response(message=e.message, code=e.http_response_code)